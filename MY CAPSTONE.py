@@ -1,19 +1,14 @@
 # 1.1 to read/extract the following JSON files according to the specifications found in the mapping document.
 
-from pyspark.sql import SparkSession
-import pyspark.sql.functions as F
-from pyspark.sql import SparkSession
-from pyspark.sql.functions import col
-
-# Create Spark session
-spark = SparkSession.builder \
-    .appName("CreditCardETL") \
-    .getOrCreate()
+from credit_card_etl import get_spark_session, extract, transform_branch, transform_credit, transform_customer
 
-# Read JSON files
-customer_df = spark.read.option("multiline", True).json("cdw_sapp_customer.json")
-creditcard_df = spark.read.option("multiline", True).json("cdw_sapp_credit.json")
-branch_df = spark.read.option("multiline", True).json("cdw_sapp_branch.json")
+# One Spark session for the whole job; every JSON file is read once with an
+# explicit schema and cached for the transform step below.
+spark = get_spark_session()
+frames = extract(spark)
+branch_df = frames["branch"]
+creditcard_df = frames["credit"]
+customer_df = frames["customer"]
 
 # Show schema and preview data
 print("branch_df")
@@ -26,33 +21,8 @@ print("customer_df")
 customer_df.printSchema()
 customer_df.show(5)
 
-from pyspark.sql.functions import col, lit, when, format_string, substring, lpad
-from pyspark.sql import SparkSession
-
-# Initialize Spark session
-spark = SparkSession.builder.appName("Data Transformation").getOrCreate()
-
-# Load the JSON file into a DataFrame
-branch_df = spark.read.option("multiline", True).json("cdw_sapp_branch.json")
-
 # Data transformation according to the mapping document
-branch_df_transformed = branch_df \
-    .withColumn("BRANCH_CODE", col("BRANCH_CODE").cast("int")) \
-    .withColumn("BRANCH_NAME", col("BRANCH_NAME").cast("string")) \
-    .withColumn("BRANCH_STREET", col("BRANCH_STREET").cast("string")) \
-    .withColumn("BRANCH_CITY", col("BRANCH_CITY").cast("string")) \
-    .withColumn("BRANCH_STATE", col("BRANCH_STATE").cast("string")) \
-    .withColumn("BRANCH_ZIP", when(col("BRANCH_ZIP").isNull(), lit("999999")).otherwise(lpad(col("BRANCH_ZIP"), 5, '0')).cast("string")) \
-    .withColumn(
-        "BRANCH_PHONE",
-        format_string(
-            "(%s)%s-%s",
-            substring(col("BRANCH_PHONE").cast("string"), 1, 3),
-            substring(col("BRANCH_PHONE").cast("string"), 4, 3),
-            substring(col("BRANCH_PHONE").cast("string"), 7, 4)
-        ).cast("string")
-    ) \
-    .withColumn("LAST_UPDATED", col("LAST_UPDATED").cast("timestamp"))
+branch_df_transformed = transform_branch(branch_df)
 
 # Show transformed DataFrame
 branch_df_transformed.show()
@@ -60,10 +30,6 @@ branch_df_transformed.show()
 print("branch_df_transformed")
 branch_df_transformed.printSchema()
 
-
-
-
-
 # Explanation:
 # Column Casting:
 
@@ -77,35 +43,8 @@ branch_df_transformed.printSchema()
 # This version maintains the functionality of the original while improving readability and adhering to common practices in PySpark data frame manipulations.
 
 
-
-
-
-
-from pyspark.sql.functions import col, concat, lpad
-from pyspark.sql import SparkSession
-from pyspark.sql.functions import col, concat, lpad
-
-# Initialize Spark session
-spark = SparkSession.builder.appName("Data Transformation").getOrCreate()
-
-# Load the JSON file into a DataFrame
-creditcard_df = spark.read.option("multiline", True).json("cdw_sapp_credit.json")
-
 # Transform the DataFrame
-creditcard_df_transformed = creditcard_df \
-    .withColumn("DAY", lpad(col("DAY").cast("string"), 2, '0')) \
-    .withColumn("MONTH", lpad(col("MONTH").cast("string"), 2, '0')) \
-    .withColumn("CUST_CC_NO", col("CREDIT_CARD_NO").cast("string")) \
-    .withColumn("TIMEID", concat(
-        col("YEAR"),
-        col("MONTH"),
-        col("DAY")
-    ).cast("string")) \
-    .withColumn("CUST_SSN", col("CUST_SSN").cast("int")) \
-    .withColumn("BRANCH_CODE", col("BRANCH_CODE").cast("int")) \
-    .withColumn("TRANSACTION_TYPE", col("TRANSACTION_TYPE").cast("string")) \
-    .withColumn("TRANSACTION_VALUE", col("TRANSACTION_VALUE").cast("double")) \
-    .withColumn("TRANSACTION_ID", col("TRANSACTION_ID").cast("int"))
+creditcard_df_transformed = transform_credit(creditcard_df)
 
 # Show transformed DataFrame
 creditcard_df_transformed.show()
@@ -113,10 +52,6 @@ creditcard_df_transformed.show()
 # Print schema of the transformed DataFrame
 creditcard_df_transformed.printSchema()
 
-
-
-
-
 # Column Casting:
 
 # Changed .cast("varchar(64)") to .cast("string") since Spark uses string for text data types.
@@ -125,40 +60,8 @@ creditcard_df_transformed.printSchema()
 # Used concat and lpad to create the TIMEID column by concatenating the YEAR, MONTH, and DAY columns and padding MONTH and DAY with leading zeros to ensure two digits.
 
 
-
-
-from pyspark.sql.functions import col, initcap, lower, concat, lit, format_string, substring
-
-
-
-from pyspark.sql import SparkSession
-from pyspark.sql.functions import col, initcap, lower, concat, lit, format_string, substring
-
-# # Initialize Spark session
-# spark = SparkSession.builder.appName("Data Transformation").getOrCreate()
-
-# Load the JSON file into a DataFrame
-# customer_df = spark.read.option("multiline", True).json("cdw_sapp_customer.json")
-
-
 # customer table("dw_sapp_customer")
-customer_df_transformed = customer_df \
-    .withColumn("SSN", col("SSN").cast("int")) \
-    .withColumn("FIRST_NAME", initcap(col("FIRST_NAME")).cast("varchar(64)")) \
-    .withColumn("MIDDLE_NAME", lower(col("MIDDLE_NAME")).cast("varchar(64)")) \
-    .withColumn("LAST_NAME", initcap(col("LAST_NAME")).cast("varchar(64)")) \
-    .withColumn("CREDIT_CARD_NO", col("CREDIT_CARD_NO").cast("varchar(64)")) \
-    .withColumn("FULL_STREET_ADDRESS", concat(col("STREET_NAME"), lit(", "), col("APT_NO")).cast("varchar(64)")) \
-    .withColumn("CUST_CITY", col("CUST_CITY").cast("varchar(64)")) \
-    .withColumn("CUST_STATE", col("CUST_STATE").cast("varchar(64)")) \
-    .withColumn("CUST_COUNTRY", col("CUST_COUNTRY").cast("varchar(64)")) \
-    .withColumn("CUST_ZIP", col("CUST_ZIP").cast("varchar(64)")) \
-    .withColumn("CUST_PHONE", format_string("(%s)%s-%s", 
-                                             substring(col("CUST_PHONE").cast("varchar(64)"), 1, 3), 
-                                             substring(col("CUST_PHONE").cast("varchar(64)"), 4, 3), 
-                                             substring(col("CUST_PHONE").cast("varchar(64)"), 4, 4)).cast("varchar(64)")) \
-    .withColumn("CUST_EMAIL", col("CUST_EMAIL").cast("varchar(64)")) \
-    .withColumn("LAST_UPDATED", col("LAST_UPDATED").cast("timestamp"))
+customer_df_transformed = transform_customer(customer_df)
 
 # Show transformed DataFrame
 customer_df_transformed.show()
@@ -178,6 +81,9 @@ customer_df_transformed.printSchema()
 # Phone Number Formatting:
 
 # Used format_string and substring to format CUST_PHONE into the desired format.
+# The transforms themselves live in credit_card_etl.py.
+
+# Extract timing report (legacy vs single pass): python credit_card_etl.py --benchmark
 
 
 
@@ -190,6 +96,11 @@ customer_df_transformed.printSchema()
 # Write Python and PySpark code to load transformed data into the database.
 # How to write DataFrame to MySQL:
 
+import os
+from incremental_load import incremental_load
+from jdbc_loader import mysql_target, write_table
+from parquet_staging import stage_spark
+
 # MySQL configurations
 mysql_url = "jdbc:mysql://localhost:3306/creditcard_capstone"
 mysql_properties = {
@@ -198,10 +109,55 @@ mysql_properties = {
     "driver": "com.mysql.cj.jdbc.Driver"
 }
 
+# LOAD_MODE=incremental upserts only the rows newer than each table's watermark
+# (LAST_UPDATED, or TIMEID/TRANSACTION_ID for transactions) instead of
+# truncating and reloading the whole table.
+LOAD_MODE = os.getenv("LOAD_MODE", "overwrite")
+
+# Check the transformed rows against the mapping-document rules (data_quality.py),
+# then stage the rows that pass as Parquet (transactions partitioned by YEAR/MONTH);
+# the rest go to staging/quarantine/ with the rules they failed. A failed load
+# can be retried with `python credit_card_etl.py --load --from-staging`
+# (transformed again, lazily, keeping the raw values the source rules check)
+from credit_card_etl import stage_validated, transform
+validated = stage_validated(transform({
+    "branch": branch_df,
+    "credit": creditcard_df,
+    "customer": customer_df,
+}, keep_source=True))
+branch_df_transformed = validated["branch"]
+creditcard_df_transformed = validated["credit"]
+customer_df_transformed = validated["customer"]
+
+# Tables created by an older ETL get the columns added since (TRANSACTION_DATE,
+# TRANSACTION_YYYYMM) before the truncate-overwrite or upsert writes into them
+from schema_bootstrap import TABLES as SCHEMA_TABLES, bootstrap
+bootstrap()
+
 # Write data to MySQL
-# branch_df_transformed.write.jdbc(url=mysql_url, table="CDW_SAPP_BRANCH", mode="overwrite", properties=mysql_properties)
-creditcard_df_transformed.write.jdbc(url=mysql_url, table="CDW_SAPP_CREDIT_CARD", mode="overwrite", properties=mysql_properties)
-# customer_df_transformed.write.jdbc(url=mysql_url, table="CDW_SAPP_CUSTOMER", mode="overwrite", properties=mysql_properties)
+if LOAD_MODE == "incremental":
+    # incremental_load(branch_df_transformed, "CDW_SAPP_BRANCH", mysql_url, mysql_properties)
+    incremental_load(creditcard_df_transformed, "CDW_SAPP_CREDIT_CARD", mysql_url, mysql_properties)
+    # incremental_load(customer_df_transformed, "CDW_SAPP_CUSTOMER", mysql_url, mysql_properties)
+else:
+    # Parallel writers partitioned by BRANCH_CODE (SSN for customers), batched INSERTs
+    batched_url, batched_properties = mysql_target(mysql_url, mysql_properties)
+    # write_table(branch_df_transformed, "CDW_SAPP_BRANCH", batched_url, batched_properties)
+    write_table(creditcard_df_transformed, "CDW_SAPP_CREDIT_CARD", batched_url, batched_properties)
+    # write_table(customer_df_transformed, "CDW_SAPP_CUSTOMER", batched_url, batched_properties)
+
+# Give the loaded tables typed columns, primary keys and the composite indexes
+# the menu queries use; `python schema_bootstrap.py --check` EXPLAINs each query.
+bootstrap()
+
+# Card-by-month bill totals: rebuilt after a full load, refreshed for the new
+# card-months after an incremental one
+import monthly_summary
+monthly_summary.refresh(full=LOAD_MODE != "incremental")
+
+# New data: cached report results (report_cache.py) from before this load are stale
+import report_cache
+report_cache.invalidate()
 
 
 
@@ -211,17 +167,13 @@ creditcard_df_transformed.write.jdbc(url=mysql_url, table="CDW_SAPP_CREDIT_CARD"
 # # Here is a good walkthrough on what a console based program looks like: https://www.geeksforgeeks.org/how-to-make-a-todo-list-cli-application-using-python/
 # # You must be able to run it from a console.
 # 2.1
-import mysql.connector
 import re
 
-# Connect to MySQL Database
-db = mysql.connector.connect(
-    host="localhost",
-    user="root",
-    password="password",
-    database="creditcard_capstone"
-)
-cursor = db.cursor()
+# Connections come from the shared pool in data_access.py; every query below is a
+# named prepared statement (see data_access.QUERIES).
+import data_access
+# Long listings are shown a page at a time (keyset pagination, transaction_pages.py)
+from transaction_pages import TransactionPager, browse
 
 def main_menu():
 
@@ -255,28 +207,13 @@ def main_menu():
         if month is None or year is None:
             return
         
-        query = f"""
-        SELECT CUST_ZIP, TRANSACTION_ID, TRANSACTION_TYPE, TRANSACTION_VALUE, YEAR, MONTH, DAY
-        FROM CDW_SAPP_CUSTOMER
-        JOIN CDW_SAPP_CREDIT_CARD ON CDW_SAPP_CUSTOMER.SSN = CDW_SAPP_CREDIT_CARD.CUST_SSN
-        WHERE CDW_SAPP_CUSTOMER.CUST_ZIP = '{customer_zipcode}'
-        AND CDW_SAPP_CREDIT_CARD.MONTH = {month}
-        AND CDW_SAPP_CREDIT_CARD.YEAR = {year}
-        ORDER BY CDW_SAPP_CREDIT_CARD.DAY DESC;
-        """
-
-        cursor.execute(query)
-        results = cursor.fetchall()
-        if results:
-            print("\nTransactions:")
-            for row in results:
-                print(f"ZIP: {row[0]}, Transaction ID: {row[1]}, Type: {row[2]}, Value: ${row[3]}, Year: {row[4]}, Month: {row[5]}, Day: {row[6]}")
-        else:
+        # The month as a TRANSACTION_DATE range: [first day, first day of the next month)
+        pager = TransactionPager("transactions_by_zip_month", (customer_zipcode, *data_access.month_bounds(year, month)))
+        print_row = lambda row: print(f"ZIP: {row[0]}, Transaction ID: {row[1]}, Type: {row[2]}, Value: ${row[3]}, Year: {row[4]}, Month: {row[5]}, Day: {row[6]}")
+        if not browse(pager, print_row):
             print("\nNo transactions found for the specified criteria.")
 
     customer_transaction_zipcode_month_year()
-    cursor.close()
-    db.close()
 
 if __name__ == "__main__":
     main_menu()
@@ -286,25 +223,20 @@ if __name__ == "__main__":
 
         # 2.2
 
-import mysql.connector
 import re
 from datetime import datetime
 
-# Connect to MySQL Database
-db = mysql.connector.connect(
-    host="localhost",
-    user="root",
-    password="password",
-    database="creditcard_capstone"
-)
-cursor = db.cursor()
+import data_access
+# Recently looked-up customers are served from memory; updates write through it
+from customer_cache import customers
 
 def check_account_details():
     customer_id = input("Please enter the customer ID: ")
+    if not customer_id.isdigit():
+        print("Invalid customer ID. Please enter the customer's SSN (digits only).")
+        return
     
-    query = "SELECT * FROM CDW_SAPP_CUSTOMER WHERE SSN = %s"
-    cursor.execute(query, (customer_id,))
-    result = cursor.fetchone()
+    result = customers.get(customer_id)
     
     if result:
         print("Customer Account Details:")
@@ -332,26 +264,11 @@ def modify_account_details():
     choice = input("Please enter the number corresponding to the field you want to update: ")
     new_value = input("Please enter the new value: ")
 
-    field_map = {
-        '1': 'FIRST_NAME',
-        '2': 'LAST_NAME',
-        '3': 'CUST_STREET',
-        '4': 'CUST_PHONE',
-        '5': 'CUST_ZIP',
-        '6': 'MIDDLE_NAME',
-        '7': 'CUST_EMAIL',
-        '8': 'CUST_COUNTRY',
-        '9': 'CUST_STATE',
-        '10': 'CUST_CITY',
-        '11': 'SSN',
-        '12': 'FULL_STREET_ADDRESS'
-    }
+    field_map = data_access.CUSTOMER_FIELDS
     
-    if choice in field_map:
+    if choice in field_map and customer_id.isdigit():
         field = field_map[choice]
-        query = f"UPDATE CDW_SAPP_CUSTOMER SET {field} = %s WHERE SSN = %s"
-        cursor.execute(query, (new_value, customer_id))
-        db.commit()
+        customers.update(customer_id, field, new_value)
         print("Customer details updated successfully.")
     else:
         print("Invalid choice. Please try again.")
@@ -365,19 +282,13 @@ def generate_monthly_bill():
         print("Invalid month/year format. Please enter as MM and YYYY.")
         return
     
-    query = """
-    SELECT SUM(TRANSACTION_VALUE)
-    FROM CDW_SAPP_CREDIT_CARD
-    WHERE CREDIT_CARD_NO = %s
-    AND MONTH = %s
-    AND YEAR = %s
-    """
-    
-    cursor.execute(query, (credit_card_number, month, year))
-    result = cursor.fetchone()
+    # Single key lookup in the card-by-month summary kept up to date by the ETL
+    result = data_access.fetchone("monthly_bill_summary", (credit_card_number, year, month))
     
     if result and result[0] is not None:
         print(f"The total bill for credit card number {credit_card_number} for {month}/{year} is ${result[0]:.2f}")
+        for transaction_type, total, count in data_access.fetchall("monthly_bill_breakdown", (credit_card_number, year, month)):
+            print(f"  {transaction_type}: ${total:.2f} ({count} transactions)")
     else:
         print("No transactions found for the given credit card number, month, and year.")
 
@@ -395,22 +306,9 @@ def display_transactions_between_dates():
     start_date = get_date("Please enter the start date (YYYY-MM-DD): ")
     end_date = get_date("Please enter the end date (YYYY-MM-DD): ")
     
-    query = """
-    SELECT TRANSACTION_ID, TRANSACTION_TYPE, TRANSACTION_VALUE, TIMEID
-    FROM CDW_SAPP_CREDIT_CARD
-    WHERE CUST_SSN = %s
-    AND TIMEID BETWEEN %s AND %s
-    ORDER BY TIMEID DESC
-    """
-    
-    cursor.execute(query, (customer_id, start_date, end_date))
-    results = cursor.fetchall()
-    
-    if results:
-        print("\nTransactions:")
-        for row in results:
-            print(f"Transaction ID: {row[0]}, Type: {row[1]}, Value: ${row[2]:.2f}, Date: {row[3]}")
-    else:
+    pager = TransactionPager("transactions_between_dates", (customer_id, start_date.date(), end_date.date()))
+    print_row = lambda row: print(f"Transaction ID: {row[0]}, Type: {row[1]}, Value: ${row[2]:.2f}, Date: {row[3]}")
+    if not browse(pager, print_row):
         print("No transactions found for the specified criteria.")
 
 def main():
@@ -440,8 +338,7 @@ def main():
 
 if __name__ == "__main__":
     main()
-    cursor.close()
-    db.close()
+    data_access.close_pool()
 
 
 
@@ -454,6 +351,16 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+# The report queries live in report_backend.REPORT_QUERIES. They run in process
+# over the staged Parquet files (REPORT_BACKEND=duckdb, the default once data is
+# staged) or against MySQL (REPORT_BACKEND=mysql).
+from report_backend import run_report
+
+# 3.1, 3.3, 5.3 and 5.4 all aggregate CDW_SAPP_CREDIT_CARD: compute them in a
+# single scan and hand each plot its piece (report_pipeline.py)
+from report_pipeline import compute_fact_reports
+fact_reports = compute_fact_reports()
+
 # Function to get database connection
 def get_db_connection():
     db_config = {
@@ -465,11 +372,9 @@ def get_db_connection():
     return mysql.connector.connect(**db_config)
 
 # 3.1 Visualization: Transaction Type with Highest Transaction Count
-def plot_transaction_type_count():
-    conn = get_db_connection()
-    query = "SELECT TRANSACTION_TYPE, COUNT(*) as count FROM CDW_SAPP_CREDIT_CARD GROUP BY TRANSACTION_TYPE"
-    df = pd.read_sql(query, conn)
-    conn.close()
+def plot_transaction_type_count(df=None):
+    if df is None:
+        df = run_report("transaction_type_count")
 
     # Print the DataFrame to inspect the results
     print(df)
@@ -484,10 +389,7 @@ def plot_transaction_type_count():
 
 # 3.2 Visualization: Top 10 States with Highest Number of Customers
 def plot_top_states_by_customers():
-    conn = get_db_connection()
-    query = "SELECT CUST_STATE, COUNT(*) as count FROM CDW_SAPP_CUSTOMER GROUP BY CUST_STATE ORDER BY count DESC LIMIT 10"
-    df = pd.read_sql(query, conn)
-    conn.close()
+    df = run_report("top_states_by_customers")
 
     # Print the DataFrame to inspect the results
     print(df)
@@ -501,17 +403,9 @@ def plot_top_states_by_customers():
     plt.show()
 
 # 3.3 Visualization: Top 10 Customers with Highest Transaction Amounts
-def plot_top_customers_by_transaction_amount():
-    conn = get_db_connection()
-    query = """
-    SELECT CUST_SSN, SUM(TRANSACTION_VALUE) as total_amount 
-    FROM CDW_SAPP_CREDIT_CARD 
-    GROUP BY CUST_SSN 
-    ORDER BY total_amount DESC 
-    LIMIT 10
-    """
-    df = pd.read_sql(query, conn)
-    conn.close()
+def plot_top_customers_by_transaction_amount(df=None):
+    if df is None:
+        df = run_report("top_customers_by_transaction_amount")
 
     # Print the DataFrame to inspect the results
     print(df)
@@ -525,9 +419,9 @@ def plot_top_customers_by_transaction_amount():
     plt.show()
 
 # Call functions to generate plots
-plot_transaction_type_count()
+plot_transaction_type_count(fact_reports["transaction_type_count"])
 plot_top_states_by_customers()
-plot_top_customers_by_transaction_amount()
+plot_top_customers_by_transaction_amount(fact_reports["top_customers_by_transaction_amount"])
 
 
 
@@ -552,26 +446,52 @@ import logging
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def fetch_data_from_api(url):
+from pyspark.sql.types import LongType, StringType, StructField, StructType
+from etl_checkpoint import CheckpointRunner
+from loan_api import LoanAPIClient
+
+# The API response is streamed into this file and read by Spark with LOAN_SCHEMA
+LOAN_NDJSON = os.path.join("staging", "loan_data.ndjson")
+
+LOAN_SCHEMA = StructType([
+    StructField("Application_ID", StringType(), True),
+    StructField("Gender", StringType(), True),
+    StructField("Married", StringType(), True),
+    StructField("Dependents", StringType(), True),
+    StructField("Education", StringType(), True),
+    StructField("Self_Employed", StringType(), True),
+    StructField("Credit_History", LongType(), True),
+    StructField("Property_Area", StringType(), True),
+    StructField("Income", StringType(), True),
+    StructField("Application_Status", StringType(), True),
+])
+
+def fetch_data_from_api(client, path=LOAN_NDJSON):
     """
-    Fetch data from the given API endpoint.
+    Fetch data from the API endpoint into an NDJSON file.
+
+    The client retries transient failures and, when the file exists, sends the
+    ETag / Last-Modified of the last loaded response, so unchanged data is not
+    downloaded again.
 
     Args:
-        url (str): The URL of the API endpoint.
+        client (LoanAPIClient): Client for the API endpoint.
+        path (str): NDJSON file to write.
 
     Returns:
-        dict: JSON data fetched from the API or None if the request fails.
+        int: Number of records fetched, or None if the data is unchanged or the request fails.
     """
     try:
-        response = requests.get(url)
-        response.raise_for_status()  # Raise an error for bad status codes
-        logging.info(f"Successfully fetched data. Response code: {response.status_code}")
-        return response.json()
+        # A 304 only means the last load is current: without its file, fetch it all
+        count = client.fetch_to_ndjson(path, conditional=os.path.exists(path))
+        if count is not None:
+            logging.info(f"Successfully fetched {count} records. Response code: {client.status_code}")
+        return count
     except requests.exceptions.RequestException as e:
         logging.error(f"Failed to fetch data from API. Error: {e}")
         return None
 
-def load_to_database(df, url, table, user, password):
+def load_to_database(df, url, table, user, password, incremental=False):
     """
     Load a DataFrame into a MySQL database.
 
@@ -581,20 +501,27 @@ def load_to_database(df, url, table, user, password):
         table (str): The table name to load data into.
         user (str): The MySQL username.
         password (str): The MySQL password.
+        incremental (bool): Upsert on Application_ID instead of overwriting the table.
+
+    Returns:
+        bool: True if the data was loaded.
     """
     try:
-        df.write.format("jdbc") \
-          .mode("overwrite") \
-          .option("url", url) \
-          .option("dbtable", table) \
-          .option("user", user) \
-          .option("password", password) \
-          .save()
+        table_name = table.split(".")[-1]
+        if incremental:
+            incremental_load(df, table_name, url, {"user": user, "password": password})
+        else:
+            batched_url, properties = mysql_target(url, {"user": user, "password": password})
+            write_table(df, table_name, batched_url, properties)
+            bootstrap({table_name: SCHEMA_TABLES[table_name]})
+        report_cache.invalidate()
         logging.info(f"Successfully loaded data into the database table: {table}")
+        return True
     except Exception as e:
         logging.error(f"Failed to load data into the database. Error: {e}")
+        return False
 
-def loan_application_data_ETL(api_url, db_url, db_table, db_user, db_password):
+def loan_application_data_ETL(api_url, db_url, db_table, db_user, db_password, incremental=False):
     """
     Perform the ETL process: fetch data from the API, transform it, and load it into the database.
 
@@ -604,12 +531,34 @@ def loan_application_data_ETL(api_url, db_url, db_table, db_user, db_password):
         db_table (str): The table name to load data into.
         db_user (str): The MySQL username.
         db_password (str): The MySQL password.
+        incremental (bool): Upsert instead of overwriting the table.
     """
-    data = fetch_data_from_api(api_url)
-    if data:
+    os.makedirs(os.path.dirname(LOAN_NDJSON), exist_ok=True)
+
+    def fetch():
+        if fetch_data_from_api(client) is None and client.status_code != 304:
+            raise RuntimeError("Could not fetch the loan application data")
+        return client.pending_validators
+
+    def load():
         spark = SparkSession.builder.appName("LoanData").getOrCreate()
-        loan_app_df = spark.createDataFrame(data)
-        load_to_database(loan_app_df, db_url, db_table, db_user, db_password)
+        loan_app_df = spark.read.schema(LOAN_SCHEMA).json(LOAN_NDJSON)
+        # Columnar copy for the section 5 loan reports (parquet_staging.read_table)
+        stage_spark({"CDW_SAPP_loan_application": loan_app_df})
+        if not load_to_database(loan_app_df, db_url, db_table, db_user, db_password, incremental):
+            raise RuntimeError(f"Could not load {LOAN_NDJSON} into {db_table}")
+        # Only now is the response known to be loaded: remember its ETag / Last-Modified
+        client.mark_loaded(validators)
+
+    # A failed load is resumed from the fetched NDJSON file on the next run, and
+    # an unchanged file (HTTP 304) is not loaded again (etl_checkpoint.py)
+    try:
+        with LoanAPIClient(api_url) as client, CheckpointRunner("loan_application_data_ETL") as runner:
+            validators = runner.stage("fetch", fetch, outputs=[LOAN_NDJSON])
+            runner.stage("load", load, inputs=[LOAN_NDJSON],
+                         params={"table": db_table, "incremental": incremental})
+    except Exception as e:
+        logging.error(f"Loan application ETL failed: {e}")
 
 # Environment variables for sensitive information
 API_URL = "https://raw.githubusercontent.com/platformps/LoanDataset/main/loan_data.json"
@@ -619,7 +568,7 @@ DB_USER = os.getenv('MYSQL_USER', 'root')
 DB_PASSWORD = os.getenv('MYSQL_PASSWORD', 'password')
 
 # To run the ETL process
-loan_application_data_ETL(API_URL, DB_URL, DB_TABLE, DB_USER, DB_PASSWORD)
+loan_application_data_ETL(API_URL, DB_URL, DB_TABLE, DB_USER, DB_PASSWORD, LOAD_MODE == "incremental")
 
 # from pyspark.sql import SparkSession
 
@@ -665,34 +614,24 @@ def get_connection():
         database='creditcard_capstone'
     )
 
-def plot_app_approved_self_emp():
-    connection = get_connection()
-    cursor = connection.cursor()
-
-    query = """
-    SELECT Application_Status, Self_Employed
-    FROM CDW_SAPP_loan_application;
-    """
-    cursor.execute(query)
-    data = cursor.fetchall()
-
-    df = pd.DataFrame(data, columns=["Application_Status", "Self_Employed"])
-    print("Data from database:")
-    print(df.head(10))  # Print the first few rows to verify data
+# The counts are computed by one grouped query (loan_analytics.py) instead of
+# fetching every application into pandas
+import loan_analytics
 
-    self_employed = df[df['Self_Employed'] == 'Yes']
-    print(f"Total self-employed applicants: {len(self_employed)}")
+def plot_app_approved_self_emp():
+    stats = loan_analytics.rates(Self_Employed='Yes')
+    print(f"Total self-employed applicants: {stats['applications']}")
 
-    approved_self_employed = self_employed[self_employed['Application_Status'] == 'Y']
-    not_approved_self_employed = len(self_employed) - len(approved_self_employed)
-    print(f"Approved self-employed applicants: {len(approved_self_employed)}")
+    approved_self_employed = stats['approved']
+    not_approved_self_employed = stats['applications'] - approved_self_employed
+    print(f"Approved self-employed applicants: {approved_self_employed}")
     print(f"Not approved self-employed applicants: {not_approved_self_employed}")
 
-    percentage_approved = (len(approved_self_employed) / len(self_employed)) * 100
+    percentage_approved = stats['approval_rate']
     print(f"Percentage of approved applications: {percentage_approved:.2f}%")
 
     labels = ['Approved', 'Not Approved']
-    sizes = [len(approved_self_employed), not_approved_self_employed]
+    sizes = [approved_self_employed, not_approved_self_employed]
     colors = ['green', 'red']
     explode = (0.1, 0)
 
@@ -701,9 +640,6 @@ def plot_app_approved_self_emp():
     plt.title(f"Percentage of Applications Approved for Self-Employed: {percentage_approved:.2f}%")
     plt.show()
 
-    cursor.close()
-    connection.close()
-
 plot_app_approved_self_emp()
 
 
@@ -729,50 +665,38 @@ def get_connection():
         print(f"Error connecting to database: {e}")
         return None
 
-def fetch_married_male_data(connection):
-    """
-    Fetch application status, gender, and marital status from the loan application table.
+def fetch_married_male_data():
     """
-    query = """
-    SELECT Application_Status, Gender, Married
-    FROM CDW_SAPP_loan_application;
+    Fetch the application and rejection counts of married male applicants (one grouped query).
     """
-    with connection.cursor() as cursor:
-        cursor.execute(query)
-        data = cursor.fetchall()
-    
-    df = pd.DataFrame(data, columns=["Application_Status", "Gender", "Married"])
-    print(df.head(10))  # Print the first few rows for verification
-    return df
+    stats = loan_analytics.rates(Gender='Male', Married='Yes')
+    print(stats)  # Print the aggregates for verification
+    return stats
 
 def plot_app_rejected_married_male():
     """
     Plot the percentage of rejection for married male applicants.
     """
-    connection = get_connection()
-    if connection:
-        df = fetch_married_male_data(connection)
-
-        married_males = df[(df['Gender'] == 'Male') & (df['Married'] == 'Yes')]
-        print(f"Total married males: {len(married_males)}")  # Verify the count
+    stats = fetch_married_male_data()
 
-        rejected_married_males = married_males[married_males['Application_Status'] == 'N']
-        print(f"Rejected married males: {len(rejected_married_males)}")  # Verify the count
+    married_males = stats['applications']
+    print(f"Total married males: {married_males}")  # Verify the count
 
-        percentage_rejected = (len(rejected_married_males) / len(married_males)) * 100
-        print(f"Percentage rejected: {percentage_rejected:.2f}%")  # Verify the percentage
+    rejected_married_males = stats['rejected']
+    print(f"Rejected married males: {rejected_married_males}")  # Verify the count
 
-        plt.figure(figsize=(10, 6))
-        labels = ['Rejected', 'Accepted']
-        sizes = [len(rejected_married_males), len(married_males) - len(rejected_married_males)]
-        colors = ['red', 'blue']
-        explode = (0.1, 0)  # explode 1st slice
-        plt.pie(sizes, explode=explode, labels=labels, colors=colors,
-                autopct='%1.2f%%', shadow=True, startangle=140)
-        plt.title(f"Percentage of Rejection for Married Male Applicants: {percentage_rejected:.2f}%")
-        plt.show()
+    percentage_rejected = stats['rejection_rate']
+    print(f"Percentage rejected: {percentage_rejected:.2f}%")  # Verify the percentage
 
-        connection.close()
+    plt.figure(figsize=(10, 6))
+    labels = ['Rejected', 'Accepted']
+    sizes = [rejected_married_males, married_males - rejected_married_males]
+    colors = ['red', 'blue']
+    explode = (0.1, 0)  # explode 1st slice
+    plt.pie(sizes, explode=explode, labels=labels, colors=colors,
+            autopct='%1.2f%%', shadow=True, startangle=140)
+    plt.title(f"Percentage of Rejection for Married Male Applicants: {percentage_rejected:.2f}%")
+    plt.show()
 
 # Function to plot the chart
 plot_app_rejected_married_male()
@@ -803,25 +727,11 @@ def get_connection():
         print(f"Error connecting to database: {e}")
         return None
 
-def fetch_top_three_months_data(connection):
+def fetch_top_three_months_data():
     """
     Fetch the top three months with the largest volume of transactions based on transaction counts.
     """
-    query = """
-    SELECT
-        SUBSTRING(TIMEID, 1, 4) AS Transaction_Year,
-        SUBSTRING(TIMEID, 5, 2) AS Transaction_Month,
-        COUNT(TRANSACTION_ID) AS Number_of_Transactions
-    FROM cdw_sapp_credit_card
-    GROUP BY Transaction_Year, Transaction_Month
-    ORDER BY Number_of_Transactions DESC
-    LIMIT 3;
-    """
-    with connection.cursor() as cursor:
-        cursor.execute(query)
-        data = cursor.fetchall()
-    
-    df = pd.DataFrame(data, columns=["Transaction_Year", "Transaction_Month", "Number_of_Transactions"])
+    df = run_report("top_three_months")
     print(df)  # Print the data for verification
     return df
 
@@ -848,18 +758,16 @@ def plot_top_three_months(df):
     plt.tight_layout()
     plt.show()
 
-def plot_top_three_months_largest_vol_tran_count():
+def plot_top_three_months_largest_vol_tran_count(df=None):
     """
     Main function to fetch data and plot the top three months with the largest volume of transactions.
     """
-    connection = get_connection()
-    if connection:
-        df = fetch_top_three_months_data(connection)
-        plot_top_three_months(df)
-        connection.close()
+    if df is None:
+        df = fetch_top_three_months_data()
+    plot_top_three_months(df)
 
 # Call the main function to plot the chart
-plot_top_three_months_largest_vol_tran_count()
+plot_top_three_months_largest_vol_tran_count(fact_reports["top_three_months"])
 
 
 
@@ -879,25 +787,10 @@ def get_connection():
         database='creditcard_capstone'
     )
 
-def plot_highest_value_in_healthcare():
-    # Establishing database connection
-    connection = get_connection()
-    cursor = connection.cursor()
-
-    # SQL query to get the total healthcare transaction value per branch
-    query = """
-    SELECT BRANCH_CODE, SUM(TRANSACTION_VALUE) AS Total_Healthcare_Transaction_Value
-    FROM cdw_sapp_credit_card
-    WHERE TRANSACTION_TYPE = 'HEALTHCARE'
-    GROUP BY BRANCH_CODE
-    ORDER BY Total_Healthcare_Transaction_Value DESC
-    LIMIT 10;
-    """
-    cursor.execute(query)
-    data = cursor.fetchall()
-
-    # Converting data to a pandas DataFrame
-    df = pd.DataFrame(data, columns=["BRANCH_CODE", "Total_Healthcare_Transaction_Value"])
+def plot_highest_value_in_healthcare(df=None):
+    # Total healthcare transaction value per branch
+    if df is None:
+        df = run_report("healthcare_by_branch")
     print("Data from database:")
     print(df.head(10))  # Print the first few rows to verify data
 
@@ -917,9 +810,5 @@ def plot_highest_value_in_healthcare():
     plt.tight_layout()
     plt.show()
 
-    # Closing the cursor and connection
-    cursor.close()
-    connection.close()
-
 # Function to plot the chart
-plot_highest_value_in_healthcare()
+plot_highest_value_in_healthcare(fact_reports["healthcare_by_branch"])
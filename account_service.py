@@ -0,0 +1,194 @@
+# Asynchronous service layer for the console operations (2.1 and 2.2).
+#
+# The menu functions are tied to input() and run one request at a time. Here
+# each operation is an asyncio coroutine that validates its arguments and runs
+# its named queries from data_access on a thread pool sized to the connection
+# pool. One process can then serve many concurrent sessions: the console, a web
+# front end, or the load test below, which simulates N operators and reports
+# p50 / p99 latency per operation:
+#     python account_service.py --operators 50 --requests 20
+
+import argparse
+import asyncio
+import math
+import random
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+
+import data_access
+from customer_cache import customers
+
+
+def _month(month):
+    if not (str(month).isdigit() and 1 <= int(month) <= 12):
+        raise ValueError(f"Invalid month: {month!r}")
+    # MONTH is stored zero-padded ("02")
+    return f"{int(month):02d}"
+
+
+def _year(year):
+    if not (str(year).isdigit() and len(str(year)) == 4):
+        raise ValueError(f"Invalid year: {year!r}")
+    return int(year)
+
+
+def _date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value).replace("-", ""), "%Y%m%d").date()
+
+
+class AccountService:
+    """
+    Coroutine API over the menu queries.
+
+    Args:
+        max_workers (int): Threads running queries; defaults to the connection pool size,
+            so a running query never waits for a connection.
+    """
+
+    def __init__(self, max_workers=data_access.POOL_SIZE):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="account-service")
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    async def check_account(self, ssn):
+        """
+        Return the CustomerRecord of a customer (from the customer cache when possible), or None.
+        """
+        return await self._run(customers.get, ssn)
+
+    async def modify_account(self, ssn, field, value):
+        """
+        Update one column of a customer.
+
+        Args:
+            ssn: Customer SSN.
+            field (str): A column of data_access.CUSTOMER_FIELDS, or its menu number.
+            value: New value.
+        """
+        field = data_access.CUSTOMER_FIELDS.get(field, field)
+        await self._run(customers.update, ssn, field, value)
+
+    async def monthly_bill(self, card, month, year):
+        """
+        Return the bill of a card for a month.
+
+        Returns:
+            dict: total, count and breakdown ([(TRANSACTION_TYPE, total, count), ...]),
+                or None when the card has no transactions that month.
+        """
+        params = (card, _year(year), _month(month))
+        summary = await self._run(data_access.fetchone, "monthly_bill_summary", params)
+        if not summary or summary[0] is None:
+            return None
+        breakdown = await self._run(data_access.fetchall, "monthly_bill_breakdown", params)
+        return {"total": summary[0], "count": summary[1], "breakdown": breakdown}
+
+    async def transactions_between_dates(self, ssn, start, end):
+        """
+        Return a customer's transactions between two dates (date, datetime or YYYYMMDD / YYYY-MM-DD text).
+        """
+        return await self._run(data_access.fetchall, "transactions_between_dates",
+                               (ssn, _date(start), _date(end)))
+
+    async def transactions_by_zip_month(self, zip_code, month, year):
+        """
+        Return the transactions of customers living in zip_code for a month and year.
+        """
+        if not re.match(r'^\d{5}$', str(zip_code)):
+            raise ValueError(f"Invalid ZIP code: {zip_code!r}")
+        return await self._run(data_access.fetchall, "transactions_by_zip_month",
+                               (str(zip_code), *data_access.month_bounds(_year(year), _month(month))))
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+
+def percentile(samples, pct):
+    """
+    Return the pct-th percentile of samples (nearest rank).
+    """
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+# The read operations of the menu, as coroutines of (service, one load_test_sample row)
+OPERATIONS = {
+    "check_account": lambda service, key: service.check_account(key[0]),
+    "monthly_bill": lambda service, key: service.monthly_bill(key[2], key[4], key[3]),
+    "transactions_between_dates": lambda service, key: service.transactions_between_dates(
+        key[0], f"{key[3]}0101", f"{key[3]}1231"),
+    "transactions_by_zip_month": lambda service, key: service.transactions_by_zip_month(key[1], key[4], key[3]),
+}
+
+
+async def load_test(operators=20, requests_per_operator=20, think_time=0.0, sample_size=1000, service=None):
+    """
+    Simulate concurrent console operators and measure the latency of every operation.
+
+    Each operator issues requests_per_operator random read operations for keys
+    sampled from the loaded data, pausing think_time seconds between them.
+
+    Returns:
+        dict: operation -> list of latencies in seconds.
+    """
+    if service is None:
+        service = AccountService()
+        try:
+            return await load_test(operators, requests_per_operator, think_time, sample_size, service)
+        finally:
+            service.close()
+
+    keys = await service._run(data_access.fetchall, "load_test_sample", (sample_size,))
+    if not keys:
+        raise RuntimeError("No transactions loaded: nothing to run the load test against")
+    latencies = {name: [] for name in OPERATIONS}
+
+    async def operator():
+        for _ in range(requests_per_operator):
+            name = random.choice(list(OPERATIONS))
+            start = time.perf_counter()
+            await OPERATIONS[name](service, random.choice(keys))
+            latencies[name].append(time.perf_counter() - start)
+            if think_time:
+                await asyncio.sleep(think_time)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(operator() for _ in range(operators)))
+    elapsed = time.perf_counter() - start
+
+    total = sum(len(samples) for samples in latencies.values())
+    print(f"\n{operators} operators, {total} requests in {elapsed:.2f} s ({total / elapsed:.1f} req/s)")
+    print(f"{'operation':<30}{'requests':>10}{'p50 (ms)':>12}{'p99 (ms)':>12}")
+    for name, samples in latencies.items():
+        if samples:
+            print(f"{name:<30}{len(samples):>10}{percentile(samples, 50) * 1000:>12.2f}"
+                  f"{percentile(samples, 99) * 1000:>12.2f}")
+    print(f"customer cache: {customers.stats()}")
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the account service with concurrent operators")
+    parser.add_argument("--operators", type=int, default=20, help="concurrent simulated operators")
+    parser.add_argument("--requests", type=int, default=20, help="requests per operator")
+    parser.add_argument("--think-time", type=float, default=0.0, help="seconds between an operator's requests")
+    args = parser.parse_args()
+
+    service = AccountService()
+    try:
+        asyncio.run(load_test(args.operators, args.requests, args.think_time, service=service))
+    finally:
+        service.close()
+        data_access.close_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+# Batch bill generation for every credit card in a month.
+#
+# Instead of one generate_monthly_bill() round trip per card, a single query
+# returns the bill of every CREDIT_CARD_NO for the month, and the rows are
+# streamed from an unbuffered cursor to CSV or Parquet chunk by chunk, so memory
+# stays constant however many cards there are.
+
+import argparse
+import csv
+import logging
+import time
+
+from db_config import connect
+from monthly_summary import SUMMARY_TABLE
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+CHUNK_SIZE = 10000
+
+BILL_COLUMNS = ["CREDIT_CARD_NO", "YEAR", "MONTH", "TOTAL_VALUE", "TRANSACTION_COUNT"]
+
+# Bills from the precomputed card-by-month summary (monthly_summary.py)
+SUMMARY_BILLS = f"""
+SELECT CREDIT_CARD_NO, YEAR, MONTH, TOTAL_VALUE, TRANSACTION_COUNT
+FROM {SUMMARY_TABLE}
+WHERE YEAR = %s AND MONTH = %s AND TRANSACTION_TYPE = 'ALL'
+ORDER BY CREDIT_CARD_NO
+"""
+
+# The same bills computed from the fact table in one grouped pass
+TRANSACTION_BILLS = """
+SELECT CREDIT_CARD_NO, YEAR, MONTH, SUM(TRANSACTION_VALUE), COUNT(*)
+FROM CDW_SAPP_CREDIT_CARD
+WHERE YEAR = %s AND MONTH = %s
+GROUP BY CREDIT_CARD_NO, YEAR, MONTH
+ORDER BY CREDIT_CARD_NO
+"""
+
+QUERIES = {
+    "summary": SUMMARY_BILLS,
+    "transactions": TRANSACTION_BILLS,
+}
+
+
+def iter_bill_chunks(year, month, source="summary", chunk_size=CHUNK_SIZE):
+    """
+    Yield the bills of every card for a month in lists of at most chunk_size rows.
+
+    Args:
+        year (int): Billing year.
+        month (str): Billing month, zero-padded ("02").
+        source (str): "summary" to read CDW_SAPP_CARD_MONTHLY_SUMMARY, or
+            "transactions" to aggregate CDW_SAPP_CREDIT_CARD directly.
+        chunk_size (int): Rows fetched from the server at a time.
+
+    Yields:
+        list: Tuples in BILL_COLUMNS order.
+    """
+    connection = connect()
+    try:
+        # Unbuffered: rows are read from the server as fetchmany() asks for them
+        cursor = connection.cursor(buffered=False)
+        cursor.execute(QUERIES[source], (int(year), f"{int(month):02d}"))
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rows
+        cursor.close()
+    finally:
+        connection.close()
+
+
+def write_csv(chunks, path):
+    count = 0
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(BILL_COLUMNS)
+        for rows in chunks:
+            writer.writerows(rows)
+            count += len(rows)
+    return count
+
+
+def write_parquet(chunks, path):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("CREDIT_CARD_NO", pa.string()),
+        ("YEAR", pa.int32()),
+        ("MONTH", pa.string()),
+        ("TOTAL_VALUE", pa.float64()),
+        ("TRANSACTION_COUNT", pa.int64()),
+    ])
+    count = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        for rows in chunks:
+            columns = list(zip(*rows))
+            # One row group per chunk
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)], schema=schema))
+            count += len(rows)
+    return count
+
+
+WRITERS = {
+    "csv": write_csv,
+    "parquet": write_parquet,
+}
+
+
+def generate_bills(year, month, path, fmt="csv", source="summary", chunk_size=CHUNK_SIZE):
+    """
+    Write the bill of every card for a month to a CSV or Parquet file.
+
+    Args:
+        year (int): Billing year.
+        month (str): Billing month.
+        path (str): Output file.
+        fmt (str): "csv" or "parquet".
+        source (str): "summary" or "transactions", see iter_bill_chunks().
+        chunk_size (int): Rows per fetch (and per Parquet row group).
+
+    Returns:
+        int: Number of bills written.
+    """
+    start = time.perf_counter()
+    count = WRITERS[fmt](iter_bill_chunks(year, month, source, chunk_size), path)
+    logging.info(f"Wrote {count} bills for {int(month):02d}/{year} to {path} in {time.perf_counter() - start:.2f} s")
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the bills of every credit card for a month")
+    parser.add_argument("--year", type=int, required=True)
+    parser.add_argument("--month", required=True, help="MM")
+    parser.add_argument("--format", choices=sorted(WRITERS), default="csv")
+    parser.add_argument("--output", help="output file (default bills_YYYY_MM.<format>)")
+    parser.add_argument("--source", choices=sorted(QUERIES), default="summary")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    month = f"{int(args.month):02d}"
+    path = args.output or f"bills_{args.year}_{month}.{args.format}"
+    generate_bills(args.year, month, path, args.format, args.source, args.chunk_size)
+
+
+if __name__ == "__main__":
+    main()
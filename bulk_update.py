@@ -0,0 +1,201 @@
+# Bulk customer account updates from a change file.
+#
+# modify_account_details changes one column of one customer and commits each
+# change, so a vendor address-change file of tens of thousands of rows took
+# hours. apply_file() reads a CSV or JSON file of (SSN, field, value) changes,
+# validates every field against data_access.CUSTOMER_FIELDS, and applies the
+# changes in batches. Each batch is one transaction, applied in file order: each
+# run of consecutive changes to the same column is inserted into a temporary table
+# in one batch and applied with one joined UPDATE, which stamps LAST_UPDATED.
+# Changes whose SSN matches no customer are logged. Rejected rows are
+# logged and skipped; a failed batch is rolled back and stops the run, leaving
+# the earlier batches committed. Each committed batch starts a new customer
+# generation, so the customer caches of the console and the account service drop
+# the records they hold.
+#     python bulk_update.py address_changes.csv --batch-size 1000
+#
+# CSV files need a SSN,FIELD,VALUE header; JSON files (an array or NDJSON) hold
+# objects with the same keys. FIELD is a column name or its menu number.
+
+import argparse
+import csv
+import logging
+import os
+import time
+from datetime import datetime
+from itertools import groupby
+
+import data_access
+from customer_cache import invalidate_all_processes
+from json_stream import batched, iter_json_array
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+BATCH_SIZE = 1000
+
+CHANGE_KEYS = ("ssn", "field", "value")
+
+
+def _iter_csv(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        # Line 1 is the header
+        for line, row in enumerate(csv.DictReader(f), 2):
+            yield line, row
+
+
+def _iter_json(path):
+    yield from enumerate(iter_json_array(path), 1)
+
+
+READERS = {
+    ".csv": _iter_csv,
+    ".json": _iter_json,
+    ".ndjson": _iter_json,
+}
+
+
+def iter_changes(path):
+    """
+    Yield (line or record number, raw change dict) for every change in a CSV or JSON file.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in READERS:
+        raise ValueError(f"Unsupported change file {path!r}: expected one of {sorted(READERS)}")
+    for position, record in READERS[extension](path):
+        yield position, {str(key).strip().lower(): value for key, value in record.items()}
+
+
+def validate(change):
+    """
+    Check one raw change and return it as (ssn, column, value).
+
+    Raises:
+        ValueError: The SSN is missing or not numeric, or the field cannot be updated.
+    """
+    missing = [key for key in CHANGE_KEYS if change.get(key) is None]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+    ssn = str(change["ssn"]).strip()
+    if not ssn.isdigit():
+        raise ValueError(f"invalid SSN {ssn!r}")
+    field = str(change["field"]).strip()
+    field = data_access.CUSTOMER_FIELDS.get(field, field.upper())
+    if field not in data_access.CUSTOMER_FIELDS.values():
+        raise ValueError(f"field cannot be updated: {change['field']!r}")
+    value = change["value"]
+    if field == "SSN":
+        if not str(value).strip().isdigit():
+            raise ValueError(f"invalid new SSN {value!r}")
+        value = int(value)
+    return int(ssn), field, value
+
+
+def _valid_changes(changes, summary):
+    for position, change in changes:
+        summary["rows"] += 1
+        try:
+            yield (position, *validate(change))
+        except ValueError as e:
+            summary["rejected"] += 1
+            logging.warning(f"Rejected change at {position}: {e}")
+
+
+def _independent_chunks(field, run):
+    # A joined UPDATE applies a chunk's changes all at once, which matches file
+    # order only while they touch distinct customers: a chunk ends before a change
+    # names an SSN an earlier change of the chunk used (or, for SSN changes, set).
+    chunk, ssns = [], set()
+    for change in run:
+        _position, ssn, _field, value = change
+        touched = {ssn, value} if field == "SSN" else {ssn}
+        if ssns & touched:
+            yield chunk
+            chunk, ssns = [], set()
+        chunk.append(change)
+        ssns |= touched
+    if chunk:
+        yield chunk
+
+
+def _apply_batch(batch):
+    updated_at = datetime.now().replace(microsecond=0)
+    affected = unmatched = 0
+    with data_access.get_pool().connection() as conn:
+        conn.execute_in_transaction("bulk_create_changes")
+        # In file order: a change may name the customer by the SSN an earlier change set
+        for field, run in groupby(batch, key=lambda change: change[2]):
+            for chunk in _independent_chunks(field, run):
+                conn.execute_in_transaction("bulk_clear_changes")
+                conn.executemany("bulk_insert_changes", [(ssn, value) for _position, ssn, _field, value in chunk])
+                # Before the UPDATE, which may change the SSNs; the UPDATE's own row
+                # count leaves out customers whose value was already the new one
+                missing = {ssn for ssn, in conn.fetchall_in_transaction("bulk_unmatched_changes")}
+                for position, ssn, _field, _value in chunk:
+                    if ssn in missing:
+                        unmatched += 1
+                        logging.warning(f"Change at {position} updated nothing: no customer with SSN {ssn}")
+                affected += conn.execute_in_transaction(f"bulk_update_customer_{field}", (updated_at,))
+        conn.commit()
+
+    invalidate_all_processes()
+    return affected, unmatched
+
+
+def apply_changes(changes, batch_size=BATCH_SIZE, dry_run=False):
+    """
+    Validate changes and apply them in transactions of batch_size rows.
+
+    Args:
+        changes (iterable): (position, raw change dict) pairs, as from iter_changes().
+        batch_size (int): Changes per transaction.
+        dry_run (bool): Only validate.
+
+    Returns:
+        dict: rows read, rejected, unmatched (valid changes that found no customer),
+            batches committed and updated (rows changed in the table).
+    """
+    summary = {"rows": 0, "rejected": 0, "unmatched": 0, "batches": 0, "updated": 0}
+    start = time.perf_counter()
+    for batch in batched(_valid_changes(changes, summary), batch_size):
+        if dry_run:
+            continue
+        try:
+            updated, unmatched = _apply_batch(batch)
+        except Exception:
+            logging.error(f"Batch {summary['batches'] + 1} rolled back; "
+                          f"{summary['batches']} earlier batches stay committed")
+            raise
+        summary["updated"] += updated
+        summary["unmatched"] += unmatched
+        summary["batches"] += 1
+        logging.info(f"Committed batch {summary['batches']} ({len(batch)} changes)")
+    logging.info(f"Processed {summary['rows']} changes in {time.perf_counter() - start:.2f} s: "
+                 f"{summary['rejected']} rejected, {summary['unmatched']} unmatched, "
+                 f"{summary['updated']} rows updated "
+                 f"in {summary['batches']} batches")
+    return summary
+
+
+def apply_file(path, batch_size=BATCH_SIZE, dry_run=False):
+    """
+    Apply the changes of a CSV or JSON change file; see apply_changes().
+    """
+    return apply_changes(iter_changes(path), batch_size, dry_run)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply a file of customer account changes in batches")
+    parser.add_argument("path", help="CSV (SSN,FIELD,VALUE header) or JSON change file")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="changes per transaction")
+    parser.add_argument("--dry-run", action="store_true", help="validate the file without updating")
+    args = parser.parse_args()
+
+    try:
+        apply_file(args.path, args.batch_size, args.dry_run)
+    finally:
+        data_access.close_pool()
+
+
+if __name__ == "__main__":
+    main()
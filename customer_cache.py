@@ -0,0 +1,203 @@
+# In-process cache of customer records for the account lookups (2.2).
+#
+# check_account_details ran SELECT * FROM CDW_SAPP_CUSTOMER on every lookup,
+# although operators look up the same customer again and again during a call.
+# CustomerCache keeps the most recently used records as compact __slots__
+# objects. modify_account_details writes through it: the UPDATE goes to the
+# database and the cached record is changed in place, so this process never
+# serves a stale record. Every write bumps the customer's version, and a lookup
+# only caches the row it read if no write to that customer happened meanwhile,
+# so a read racing an update on another thread cannot cache the old row.
+#
+# Writes made by other processes cannot reach this cache directly. They start a
+# new customer generation instead (invalidate_all_processes(), e.g. bulk_update.py),
+# a counter in watermarks.json next to the report_cache data generation of the
+# ETL loads; a change of either empties the cache of every process.
+
+import threading
+from collections import OrderedDict
+
+import data_access
+from report_cache import GENERATION_KEY as REPORT_GENERATION_KEY
+from watermark_store import WATERMARK_FILE, read_watermarks, update_watermarks
+
+GENERATION_KEY = "CUSTOMER_GENERATION"
+
+MAX_CUSTOMERS = 1024
+
+# Per-customer write versions kept before they are reset (with a new epoch)
+MAX_VERSIONS = 4 * MAX_CUSTOMERS
+
+
+class CustomerRecord:
+    """
+    One CDW_SAPP_CUSTOMER row; attributes are the data_access.CUSTOMER_COLUMNS.
+    """
+
+    __slots__ = tuple(data_access.CUSTOMER_COLUMNS)
+
+    def __init__(self, *values):
+        for column, value in zip(self.__slots__, values):
+            setattr(self, column, value)
+
+    def __iter__(self):
+        return (getattr(self, column) for column in self.__slots__)
+
+    def as_tuple(self):
+        return tuple(self)
+
+    def __repr__(self):
+        return repr(self.as_tuple())
+
+
+def current_generation(watermark_file=WATERMARK_FILE):
+    """
+    Return the (report data generation, customer generation) pair the cached records belong to.
+    """
+    watermarks = read_watermarks(watermark_file)
+    return watermarks.get(REPORT_GENERATION_KEY, 0), watermarks.get(GENERATION_KEY, 0)
+
+
+def invalidate_all_processes(watermark_file=WATERMARK_FILE):
+    """
+    Start a new customer generation, so every process empties its customer cache.
+
+    Called after customer rows were changed without going through a CustomerCache.
+
+    Returns:
+        int: The new customer generation.
+    """
+    with update_watermarks(watermark_file) as watermarks:
+        watermarks[GENERATION_KEY] = watermarks.get(GENERATION_KEY, 0) + 1
+    return watermarks[GENERATION_KEY]
+
+
+def _key(ssn):
+    # SSN is an INT column; "123456100" and 123456100 are the same customer
+    return int(ssn)
+
+
+class CustomerCache:
+    """
+    LRU cache of CustomerRecord objects keyed by SSN, with write-through updates.
+
+    Args:
+        max_size (int): Records kept before the least recently used one is evicted.
+        watermark_file (str): File holding the data and customer generations.
+    """
+
+    def __init__(self, max_size=MAX_CUSTOMERS, watermark_file=WATERMARK_FILE):
+        self.max_size = max_size
+        self.watermark_file = watermark_file
+        self.hits = 0
+        self.misses = 0
+        self._records = OrderedDict()
+        self._generation = None
+        # SSN -> number of writes; _epoch changes when every customer is invalidated
+        self._versions = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+
+    # The methods below are called with the lock held
+
+    def _check_generation(self, generation):
+        if generation != self._generation:
+            self._clear()
+            self._generation = generation
+
+    def _clear(self):
+        self._records.clear()
+        self._versions.clear()
+        self._epoch += 1
+
+    def _version(self, key):
+        return self._epoch, self._versions.get(key, 0)
+
+    def _bump(self, key):
+        if len(self._versions) >= MAX_VERSIONS and key not in self._versions:
+            # A new epoch still tells every read in flight that it may be stale
+            self._versions.clear()
+            self._epoch += 1
+        self._versions[key] = self._versions.get(key, 0) + 1
+
+    def _store(self, key, record):
+        self._records[key] = record
+        self._records.move_to_end(key)
+        while len(self._records) > self.max_size:
+            self._records.popitem(last=False)
+
+    def get(self, ssn):
+        """
+        Return the CustomerRecord of ssn, or None if there is no such customer.
+        """
+        key = _key(ssn)
+        # Read outside the lock (a stat of watermarks.json unless it changed)
+        generation = current_generation(self.watermark_file)
+        with self._lock:
+            self._check_generation(generation)
+            record = self._records.get(key)
+            if record is not None:
+                self._records.move_to_end(key)
+                self.hits += 1
+                return record
+            self.misses += 1
+            version = self._version(key)
+
+        row = data_access.fetchone("customer_record", (key,))
+        if row is None:
+            return None
+        record = CustomerRecord(*row)
+        generation = current_generation(self.watermark_file)
+        with self._lock:
+            self._check_generation(generation)
+            # An update since the read started may not be in row: return it, but do not cache it
+            if self._version(key) == version:
+                self._store(key, record)
+        return record
+
+    def update(self, ssn, field, value):
+        """
+        Write one column of a customer to the database, then to the cached record.
+
+        Args:
+            ssn: Customer SSN.
+            field (str): A column of data_access.CUSTOMER_FIELDS.
+            value: New value.
+        """
+        if field not in data_access.CUSTOMER_FIELDS.values():
+            raise ValueError(f"Field cannot be updated: {field!r}")
+        key = _key(ssn)
+        if field == "SSN":
+            value = _key(value)
+        data_access.execute(f"update_customer_{field}", (value, key))
+
+        with self._lock:
+            self._bump(key)
+            if field == "SSN":
+                self._bump(value)
+            record = self._records.pop(key, None)
+            if record is None or field not in CustomerRecord.__slots__:
+                return
+            setattr(record, field, value)
+            self._store(value if field == "SSN" else key, record)
+
+    def invalidate(self, ssn=None):
+        """
+        Drop one customer (or every customer) from the cache, e.g. after an update made elsewhere.
+        """
+        with self._lock:
+            if ssn is None:
+                self._clear()
+            else:
+                self._bump(_key(ssn))
+                self._records.pop(_key(ssn), None)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._records),
+                    "hit_rate": self.hits / lookups if lookups else 0.0}
+
+
+# Shared by the console and the account service
+customers = CustomerCache()
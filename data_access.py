@@ -0,0 +1,455 @@
+# Data-access layer for the console menu (Functional Requirements 2.1 and 2.2).
+#
+# A bounded pool of MySQL connections shared by every menu function, instead of
+# a connect() per section and a single global cursor. Every menu query is a
+# named server-side prepared statement; each pooled connection prepares a query
+# the first time it runs it and reuses the statement afterwards. Connections are
+# health-checked on checkout and transparently reconnected when the server
+# dropped them.
+
+import logging
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date
+
+from db_config import DB_HOST, DB_NAME, DB_PASSWORD, DB_PORT, DB_USER
+
+POOL_SIZE = 8
+POOL_TIMEOUT = 10            # seconds to wait for a free connection
+HEALTH_CHECK_INTERVAL = 30   # ping connections idle for longer than this (seconds)
+RECONNECT_ATTEMPTS = 3
+RECONNECT_DELAY = 1
+
+# Columns of a CDW_SAPP_CUSTOMER record, in "customer_record" order
+CUSTOMER_COLUMNS = [
+    "SSN", "FIRST_NAME", "MIDDLE_NAME", "LAST_NAME", "CREDIT_CARD_NO", "APT_NO", "STREET_NAME",
+    "FULL_STREET_ADDRESS", "CUST_CITY", "CUST_STATE", "CUST_COUNTRY", "CUST_ZIP", "CUST_PHONE",
+    "CUST_EMAIL", "LAST_UPDATED",
+]
+
+# Every query the menu runs, by name
+QUERIES = {
+    # 2.1 transactions made by customers living in a ZIP code, for a month and year
+    # (parameters: ZIP code, then month_bounds() of the month, so the month is a
+    # TRANSACTION_DATE range on the (CUST_SSN, TRANSACTION_DATE) index)
+    "transactions_by_zip_month": """
+        SELECT CUST_ZIP, TRANSACTION_ID, TRANSACTION_TYPE, TRANSACTION_VALUE, YEAR, MONTH, DAY
+        FROM CDW_SAPP_CUSTOMER
+        JOIN CDW_SAPP_CREDIT_CARD ON CDW_SAPP_CUSTOMER.SSN = CDW_SAPP_CREDIT_CARD.CUST_SSN
+        WHERE CDW_SAPP_CUSTOMER.CUST_ZIP = %s
+        AND CDW_SAPP_CREDIT_CARD.TRANSACTION_DATE >= %s
+        AND CDW_SAPP_CREDIT_CARD.TRANSACTION_DATE < %s
+        ORDER BY CDW_SAPP_CREDIT_CARD.TRANSACTION_DATE DESC""",
+    # 2.2 account details
+    "customer_by_ssn": "SELECT * FROM CDW_SAPP_CUSTOMER WHERE SSN = %s",
+    # 2.2 account details as a CUSTOMER_COLUMNS row, for the customer cache (customer_cache.py)
+    "customer_record": f"SELECT {', '.join(CUSTOMER_COLUMNS)} FROM CDW_SAPP_CUSTOMER WHERE SSN = %s",
+    # 2.2 monthly bill
+    "monthly_bill": """
+        SELECT SUM(TRANSACTION_VALUE)
+        FROM CDW_SAPP_CREDIT_CARD
+        WHERE CREDIT_CARD_NO = %s
+        AND MONTH = %s
+        AND YEAR = %s""",
+    # 2.2 monthly bill from the precomputed summary (monthly_summary.py): one key lookup
+    "monthly_bill_summary": """
+        SELECT TOTAL_VALUE, TRANSACTION_COUNT
+        FROM CDW_SAPP_CARD_MONTHLY_SUMMARY
+        WHERE CREDIT_CARD_NO = %s
+        AND YEAR = %s
+        AND MONTH = %s
+        AND TRANSACTION_TYPE = 'ALL'""",
+    "monthly_bill_breakdown": """
+        SELECT TRANSACTION_TYPE, TOTAL_VALUE, TRANSACTION_COUNT
+        FROM CDW_SAPP_CARD_MONTHLY_SUMMARY
+        WHERE CREDIT_CARD_NO = %s
+        AND YEAR = %s
+        AND MONTH = %s
+        AND TRANSACTION_TYPE <> 'ALL'
+        ORDER BY TOTAL_VALUE DESC""",
+    # 2.2 transactions between two dates
+    "transactions_between_dates": """
+        SELECT TRANSACTION_ID, TRANSACTION_TYPE, TRANSACTION_VALUE, TRANSACTION_DATE
+        FROM CDW_SAPP_CREDIT_CARD
+        WHERE CUST_SSN = %s
+        AND TRANSACTION_DATE BETWEEN %s AND %s
+        ORDER BY TRANSACTION_DATE DESC""",
+    # Keys the load test (account_service.py) draws its requests from
+    "load_test_sample": """
+        SELECT cc.CUST_SSN, cust.CUST_ZIP, cc.CREDIT_CARD_NO, cc.YEAR, cc.MONTH
+        FROM CDW_SAPP_CREDIT_CARD cc
+        JOIN CDW_SAPP_CUSTOMER cust ON cust.SSN = cc.CUST_SSN
+        LIMIT %s""",
+}
+
+# Keyset-paginated versions of the two transaction listings (transaction_pages.py).
+# Rows are ordered newest first by (TRANSACTION_DATE, TRANSACTION_ID); a page is
+# the rows just older ("_older") or just newer ("_newer") than a row of the
+# previous page, so no page needs an OFFSET scan over the rows before it.
+# Parameters: the listing's own, then the seek key (TRANSACTION_DATE,
+# TRANSACTION_DATE, TRANSACTION_ID), then the page size.
+PAGED_LISTINGS = {
+    "transactions_by_zip_month": """
+        SELECT CUST_ZIP, TRANSACTION_ID, TRANSACTION_TYPE, TRANSACTION_VALUE, YEAR, MONTH, DAY, TRANSACTION_DATE
+        FROM CDW_SAPP_CUSTOMER
+        JOIN CDW_SAPP_CREDIT_CARD ON CDW_SAPP_CUSTOMER.SSN = CDW_SAPP_CREDIT_CARD.CUST_SSN
+        WHERE CDW_SAPP_CUSTOMER.CUST_ZIP = %s
+        AND CDW_SAPP_CREDIT_CARD.TRANSACTION_DATE >= %s
+        AND CDW_SAPP_CREDIT_CARD.TRANSACTION_DATE < %s
+        AND {seek}
+        ORDER BY TRANSACTION_DATE {order}, TRANSACTION_ID {order}
+        LIMIT %s""",
+    "transactions_between_dates": """
+        SELECT TRANSACTION_ID, TRANSACTION_TYPE, TRANSACTION_VALUE, TRANSACTION_DATE
+        FROM CDW_SAPP_CREDIT_CARD
+        WHERE CUST_SSN = %s
+        AND TRANSACTION_DATE BETWEEN %s AND %s
+        AND {seek}
+        ORDER BY TRANSACTION_DATE {order}, TRANSACTION_ID {order}
+        LIMIT %s""",
+}
+
+PAGE_SEEKS = {
+    # direction -> (seek predicate, sort order); "first" takes no seek key
+    "first": ("1 = 1", "DESC"),
+    "older": ("(TRANSACTION_DATE < %s OR (TRANSACTION_DATE = %s AND TRANSACTION_ID < %s))", "DESC"),
+    "newer": ("(TRANSACTION_DATE > %s OR (TRANSACTION_DATE = %s AND TRANSACTION_ID > %s))", "ASC"),
+}
+
+for _listing, _query in PAGED_LISTINGS.items():
+    for _direction, (_seek, _order) in PAGE_SEEKS.items():
+        QUERIES[f"{_listing}_{_direction}"] = _query.format(seek=_seek, order=_order)
+
+
+def month_bounds(year, month):
+    """
+    Return (first day of the month, first day of the next month), the TRANSACTION_DATE
+    range of a month: TRANSACTION_DATE >= start AND TRANSACTION_DATE < end.
+    """
+    year, month = int(year), int(month)
+    start = date(year, month, 1)
+    end = date(year + month // 12, month % 12 + 1, 1)
+    return start, end
+
+
+# Columns modify_account_details may change, in menu order
+CUSTOMER_FIELDS = {
+    '1': 'FIRST_NAME',
+    '2': 'LAST_NAME',
+    '3': 'STREET_NAME',
+    '4': 'CUST_PHONE',
+    '5': 'CUST_ZIP',
+    '6': 'MIDDLE_NAME',
+    '7': 'CUST_EMAIL',
+    '8': 'CUST_COUNTRY',
+    '9': 'CUST_STATE',
+    '10': 'CUST_CITY',
+    '11': 'SSN',
+    '12': 'FULL_STREET_ADDRESS'
+}
+
+# Bulk changes (bulk_update.py) are staged in a per-session temporary table, one
+# run of changes to the same column at a time, and applied with one joined UPDATE.
+# Creating or clearing a temporary table does not commit the open transaction.
+QUERIES.update({
+    "bulk_create_changes": """
+        CREATE TEMPORARY TABLE IF NOT EXISTS BULK_CUSTOMER_CHANGES (
+            SSN INT NOT NULL PRIMARY KEY,
+            VALUE VARCHAR(255))""",
+    "bulk_clear_changes": "DELETE FROM BULK_CUSTOMER_CHANGES",
+    "bulk_insert_changes": "INSERT INTO BULK_CUSTOMER_CHANGES (SSN, VALUE) VALUES (%s, %s)",
+    # Staged changes whose SSN matches no customer
+    "bulk_unmatched_changes": """
+        SELECT b.SSN
+        FROM BULK_CUSTOMER_CHANGES b
+        LEFT JOIN CDW_SAPP_CUSTOMER c ON c.SSN = b.SSN
+        WHERE c.SSN IS NULL""",
+})
+
+# One prepared UPDATE per column: the column name cannot be a statement parameter.
+# The bulk_ variants apply the staged changes and also stamp LAST_UPDATED.
+for _field in CUSTOMER_FIELDS.values():
+    QUERIES[f"update_customer_{_field}"] = f"UPDATE CDW_SAPP_CUSTOMER SET {_field} = %s WHERE SSN = %s"
+    QUERIES[f"bulk_update_customer_{_field}"] = (
+        f"UPDATE CDW_SAPP_CUSTOMER c JOIN BULK_CUSTOMER_CHANGES b ON c.SSN = b.SSN "
+        f"SET c.{_field} = b.VALUE, c.LAST_UPDATED = %s")
+
+
+class PooledConnection:
+    """
+    One pooled MySQL connection and the prepared statements created on it.
+    """
+
+    def __init__(self, connect_kwargs):
+        self._connect_kwargs = connect_kwargs
+        self._cnx = None
+        self._statements = {}
+        self.last_used = 0.0
+        self._connect()
+
+    def _connect(self):
+        import mysql.connector
+
+        self._cnx = mysql.connector.connect(**self._connect_kwargs)
+        self._statements = {}  # prepared statements do not survive a reconnect
+        self.last_used = time.monotonic()
+
+    def _reconnect(self):
+        logging.warning("MySQL connection lost, reconnecting")
+        try:
+            self._cnx.close()
+        except Exception:
+            pass
+        for attempt in range(1, RECONNECT_ATTEMPTS + 1):
+            try:
+                self._connect()
+                return
+            except Exception:
+                if attempt == RECONNECT_ATTEMPTS:
+                    raise
+                time.sleep(RECONNECT_DELAY * attempt)
+
+    def check(self):
+        """
+        Ping the server if the connection has been idle, reconnecting when the ping fails.
+        """
+        if time.monotonic() - self.last_used < HEALTH_CHECK_INTERVAL:
+            return
+        try:
+            self._cnx.ping(reconnect=False)
+        except Exception:
+            self._reconnect()
+
+    def _statement(self, name):
+        # A prepared cursor prepares its statement on the server the first time
+        # it executes it and reuses it for every later execute of the same SQL.
+        cursor = self._statements.get(name)
+        if cursor is None:
+            cursor = self._cnx.cursor(prepared=True)
+            self._statements[name] = cursor
+        return cursor
+
+    def _run(self, name, params, fetch):
+        import mysql.connector
+
+        for attempt in (1, 2):
+            try:
+                cursor = self._statement(name)
+                cursor.execute(QUERIES[name], params)
+                self.last_used = time.monotonic()
+                return fetch(cursor)
+            except (mysql.connector.errors.OperationalError, mysql.connector.errors.InterfaceError):
+                # Server went away between the health check and the query: retry once
+                if attempt == 2:
+                    raise
+                self._reconnect()
+
+    def fetchone(self, name, params=()):
+        # Drain the result so the connection is free for the next statement
+        rows = self._run(name, params, lambda cursor: cursor.fetchall())
+        return rows[0] if rows else None
+
+    def fetchall(self, name, params=()):
+        return self._run(name, params, lambda cursor: cursor.fetchall())
+
+    def execute(self, name, params=()):
+        """
+        Run a data-changing statement and commit it.
+
+        Returns:
+            int: Number of affected rows.
+        """
+        rowcount = self._run(name, params, lambda cursor: cursor.rowcount)
+        self._cnx.commit()
+        return rowcount
+
+    def _run_in_transaction(self, name, run):
+        # A plain (text) cursor: the driver only batches an executemany() there
+        cursor = self._cnx.cursor()
+        try:
+            result = run(cursor, QUERIES[name])
+        finally:
+            cursor.close()
+        self.last_used = time.monotonic()
+        return result
+
+    def execute_in_transaction(self, name, params=()):
+        """
+        Run a statement without committing: the caller commits (or rolls back) the
+        whole transaction.
+
+        Not retried on a lost connection, since a reconnect would silently drop the
+        earlier statements of the transaction.
+
+        Returns:
+            int: Number of affected rows.
+        """
+        def run(cursor, query):
+            cursor.execute(query, params)
+            return cursor.rowcount
+
+        return self._run_in_transaction(name, run)
+
+    def fetchall_in_transaction(self, name, params=()):
+        """
+        Run a query inside the caller's transaction and return all rows; see
+        execute_in_transaction().
+        """
+        def run(cursor, query):
+            cursor.execute(query, params)
+            return cursor.fetchall()
+
+        return self._run_in_transaction(name, run)
+
+    def executemany(self, name, seq_params):
+        """
+        Run an INSERT ... VALUES statement for every parameter tuple without
+        committing; see execute_in_transaction(). The driver sends the rows as
+        multi-row INSERTs instead of one statement per tuple.
+
+        Returns:
+            int: Number of inserted rows.
+        """
+        def run(cursor, query):
+            cursor.executemany(query, seq_params)
+            return cursor.rowcount
+
+        return self._run_in_transaction(name, run)
+
+    def commit(self):
+        self._cnx.commit()
+
+    def rollback(self):
+        self._cnx.rollback()
+
+    def close(self):
+        for cursor in self._statements.values():
+            try:
+                cursor.close()
+            except Exception:
+                pass
+        self._statements = {}
+        self._cnx.close()
+
+
+class ConnectionPool:
+    """
+    Bounded pool of PooledConnection objects.
+
+    Connections are opened lazily up to size; when all of them are checked out,
+    connection() waits up to timeout seconds for one to be returned.
+    """
+
+    def __init__(self, size=POOL_SIZE, timeout=POOL_TIMEOUT, **connect_kwargs):
+        self.size = size
+        self.timeout = timeout
+        self._connect_kwargs = connect_kwargs or {
+            "host": DB_HOST,
+            "port": DB_PORT,
+            "user": DB_USER,
+            "password": DB_PASSWORD,
+            "database": DB_NAME,
+        }
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._all = []
+        self._lock = threading.Lock()
+
+    def _checkout(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise TimeoutError(f"No free database connection after {self.timeout} s (pool size {self.size})")
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = PooledConnection(self._connect_kwargs)
+                with self._lock:
+                    self._all.append(conn)
+            conn.check()
+            return conn
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _checkin(self, conn):
+        self._idle.put(conn)
+        self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """
+        Check out a healthy connection for the duration of a with block.
+        """
+        conn = self._checkout()
+        try:
+            yield conn
+        except Exception:
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            raise
+        finally:
+            self._checkin(conn)
+
+    def close(self):
+        """
+        Close every connection the pool has opened.
+        """
+        with self._lock:
+            for conn in self._all:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            self._all = []
+        self._idle = queue.LifoQueue()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """
+    Return the process-wide connection pool, creating it on first use.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool()
+        return _pool
+
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+def fetchone(name, params=()):
+    """
+    Run the named query on a pooled connection and return its first row.
+    """
+    with get_pool().connection() as conn:
+        return conn.fetchone(name, params)
+
+
+def fetchall(name, params=()):
+    """
+    Run the named query on a pooled connection and return all rows.
+    """
+    with get_pool().connection() as conn:
+        return conn.fetchall(name, params)
+
+
+def execute(name, params=()):
+    """
+    Run the named data-changing statement on a pooled connection and commit it.
+    """
+    with get_pool().connection() as conn:
+        return conn.execute(name, params)
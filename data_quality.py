@@ -0,0 +1,243 @@
+# Data-quality rules of the mapping document, checked as part of the transform.
+#
+# Nothing used to check the transformed values: a malformed phone or ZIP, a TIMEID
+# that is not a date or a negative TRANSACTION_VALUE loaded like any other row.
+# RULES declares the checks per source. Each check is compiled to a column
+# expression for the Spark engine and to a vectorized mask for the pandas engine,
+# and runs on the transformed columns in the same projection as the transform:
+# Spark fuses it into the transform stage, and pandas evaluates it on the arrays
+# already in memory, so validation adds no second scan of the data. Rules on a
+# source value the transform overwrites (the raw CUST_PHONE digits) read a copy
+# that the transform keeps in DQ_SOURCE_<column> when asked to (keep_source_*).
+#
+# A row failing a "reject" rule is moved to the quarantine output
+# (staging/quarantine/<TABLE>/) with the names of the rules it failed in
+# DQ_FAILED. "Flag" rules only count their failures; they cover known gaps in the
+# source that the mapping document tolerates (the 999999 default BRANCH_ZIP,
+# customer phones with missing digits). Per-rule counts are logged and written to
+# staging/quarantine/dq_report.json.
+
+import json
+import logging
+import os
+from collections import namedtuple
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from parquet_staging import STAGING_DIR
+
+QUARANTINE_DIR = os.path.join(os.path.dirname(STAGING_DIR), "quarantine")
+REPORT_FILE = os.path.join(QUARANTINE_DIR, "dq_report.json")
+
+# Prefix of the raw source values kept for the source rules
+SOURCE_PREFIX = "DQ_SOURCE_"
+# Comma-separated names of the rules a row failed
+DQ_FAILED = "DQ_FAILED"
+# True when the row failed a reject rule
+DQ_REJECTED = "DQ_REJECTED"
+
+SSN_RANGE = (1, 999999999)
+
+# check: "matches" (value is a regular expression the whole text must match),
+# "between" (value is an inclusive (low, high) range), "positive" or "not_null"
+# (e.g. a TIMEID that did not parse to a TRANSACTION_DATE). A null value fails
+# every check. reject: quarantine failing rows rather than only count them.
+# source: check the raw source value of column rather than the transformed one.
+Rule = namedtuple("Rule", "name column check value reject source", defaults=(False,))
+
+RULES = {
+    "branch": [
+        Rule("branch_phone_format", "BRANCH_PHONE", "matches", r"\(\d{3}\)\d{3}-\d{4}", True),
+        # The mapping document fills a missing ZIP with 999999
+        Rule("branch_zip_5_digits", "BRANCH_ZIP", "matches", r"\d{5}", False),
+    ],
+    "credit": [
+        Rule("timeid_valid_date", "TRANSACTION_DATE", "not_null", None, True),
+        Rule("transaction_value_positive", "TRANSACTION_VALUE", "positive", None, True),
+        Rule("credit_card_no_16_digits", "CREDIT_CARD_NO", "matches", r"\d{16}", True),
+        Rule("cust_ssn_range", "CUST_SSN", "between", SSN_RANGE, True),
+    ],
+    "customer": [
+        Rule("ssn_range", "SSN", "between", SSN_RANGE, True),
+        Rule("cust_zip_5_digits", "CUST_ZIP", "matches", r"\d{5}", True),
+        Rule("credit_card_no_16_digits", "CREDIT_CARD_NO", "matches", r"\d{16}", True),
+        Rule("cust_phone_format", "CUST_PHONE", "matches", r"\(\d{3}\)\d{3}-\d{4}", False),
+        # The formatted phone repeats digits 4-7 as its last group, so it looks
+        # valid even for a 7-digit source (no area code): check the source digits.
+        # Counted, not rejected: the customer rows are usable without a phone
+        Rule("cust_phone_source_10_digits", "CUST_PHONE", "matches", r"\d{10}", False, source=True),
+    ],
+}
+
+
+def _checked_column(rule):
+    return SOURCE_PREFIX + rule.column if rule.source else rule.column
+
+
+def _source_columns(source):
+    return [rule.column for rule in RULES[source] if rule.source]
+
+
+def _check_source_columns(columns, source):
+    missing = [SOURCE_PREFIX + column for column in _source_columns(source) if SOURCE_PREFIX + column not in columns]
+    if missing:
+        raise ValueError(f"{source} has no {', '.join(missing)}: transform it with keep_source=True")
+
+
+def keep_source_spark(df, source):
+    """
+    Copy the raw columns the source rules of source check to DQ_SOURCE_<column>; run before the transform.
+    """
+    for column in _source_columns(source):
+        df = df.withColumn(SOURCE_PREFIX + column, df[column].cast("string"))
+    return df
+
+
+def _spark_passes(rule):
+    from pyspark.sql.functions import coalesce, col, lit
+
+    column = col(_checked_column(rule))
+    if rule.check == "matches":
+        condition = column.cast("string").rlike(f"^{rule.value}$")
+    elif rule.check == "between":
+        condition = column.between(*rule.value)
+    elif rule.check == "positive":
+        condition = column > 0
+    elif rule.check == "not_null":
+        condition = column.isNotNull()
+    else:
+        raise ValueError(f"Unknown check {rule.check!r} in rule {rule.name}")
+    return coalesce(condition, lit(False))
+
+
+def validate_spark(df, source):
+    """
+    Add DQ_FAILED and DQ_REJECTED to a transformed Spark DataFrame.
+
+    The checks are plain column expressions, so Spark evaluates them in the same
+    projection as the transform that produced df.
+
+    Args:
+        df (DataFrame): Output of the source's transform, run on keep_source_spark(df, source).
+        source (str): Key of RULES ("branch", "credit" or "customer").
+
+    Returns:
+        DataFrame: df with the two columns added (lazily).
+    """
+    from pyspark.sql.functions import concat_ws, lit, when
+
+    _check_source_columns(df.columns, source)
+    rules = RULES[source]
+    passes = {rule.name: _spark_passes(rule) for rule in rules}
+    failed = concat_ws(",", *[when(~passes[rule.name], lit(rule.name)) for rule in rules])
+    rejected = lit(False)
+    for rule in rules:
+        if rule.reject:
+            rejected = rejected | ~passes[rule.name]
+    return df.withColumn(DQ_FAILED, failed).withColumn(DQ_REJECTED, rejected)
+
+
+def rule_counts_spark(validated, source):
+    """
+    Count the rows, rejected rows and failures per rule of a validate_spark() DataFrame in one aggregation.
+    """
+    from pyspark.sql.functions import col, count, lit, sum as sum_, when
+
+    rules = RULES[source]
+    row = validated.agg(
+        count(lit(1)).alias("rows"),
+        sum_(when(col(DQ_REJECTED), 1).otherwise(0)).alias("rejected"),
+        *[sum_(when(~_spark_passes(rule), 1).otherwise(0)).alias(rule.name) for rule in rules],
+    ).first()
+    return {"rows": row["rows"], "rejected": row["rejected"] or 0,
+            "rules": {rule.name: row[rule.name] or 0 for rule in rules}}
+
+
+def split_spark(validated):
+    """
+    Return (rows to load without the DQ columns, rejected rows with DQ_FAILED) of a validate_spark() DataFrame.
+    """
+    from pyspark.sql.functions import col
+
+    sources = [column for column in validated.columns if column.startswith(SOURCE_PREFIX)]
+    clean = validated.filter(~col(DQ_REJECTED)).drop(DQ_FAILED, DQ_REJECTED, *sources)
+    quarantined = validated.filter(col(DQ_REJECTED)).drop(DQ_REJECTED)
+    return clean, quarantined
+
+
+def keep_source_pandas(df, source):
+    """
+    Copy the raw columns the source rules of source check to DQ_SOURCE_<column>; run before the transform.
+    """
+    df = df.copy()
+    for column in _source_columns(source):
+        values = df[column]
+        if pd.api.types.is_numeric_dtype(values):
+            # Integers read with missing values are floats: 1237818.0 is the source 1237818
+            values = pd.to_numeric(values, errors="coerce").astype("Int64")
+        df[SOURCE_PREFIX + column] = values.astype("string")
+    return df
+
+
+def _pandas_passes(df, rule):
+    s = df[_checked_column(rule)]
+    if rule.check == "matches":
+        passes = s.astype("string").str.fullmatch(rule.value)
+    elif rule.check == "between":
+        passes = pd.to_numeric(s, errors="coerce").between(*rule.value)
+    elif rule.check == "positive":
+        passes = pd.to_numeric(s, errors="coerce") > 0
+    elif rule.check == "not_null":
+        passes = s.notna()
+    else:
+        raise ValueError(f"Unknown check {rule.check!r} in rule {rule.name}")
+    return passes.fillna(False).astype(bool).to_numpy() & s.notna().to_numpy()
+
+
+def validate_pandas(df, source):
+    """
+    Check a transformed pandas DataFrame against the rules of source.
+
+    df is the output of the source's transform, run on keep_source_pandas(df, source).
+
+    Returns:
+        tuple: (rows to load, rejected rows with DQ_FAILED, counts), counts being
+            {"rows", "rejected", "rules": {rule name: failures}}.
+    """
+    _check_source_columns(df.columns, source)
+    rules = RULES[source]
+    failures = {rule.name: ~_pandas_passes(df, rule) for rule in rules}
+    rejected = np.zeros(len(df), dtype=bool)
+    failed = np.full(len(df), "", dtype=object)
+    for rule in rules:
+        if rule.reject:
+            rejected |= failures[rule.name]
+        failed = np.where(failures[rule.name], failed + rule.name + ",", failed)
+
+    quarantined = df[rejected].copy()
+    quarantined[DQ_FAILED] = pd.Series(failed[rejected], index=quarantined.index, dtype="string").str.rstrip(",")
+    counts = {"rows": len(df), "rejected": int(rejected.sum()),
+              "rules": {name: int(mask.sum()) for name, mask in failures.items()}}
+    sources = [column for column in df.columns if column.startswith(SOURCE_PREFIX)]
+    return df[~rejected].drop(columns=sources), quarantined, counts
+
+
+def report(counts, path=REPORT_FILE):
+    """
+    Log the per-rule counts of a run and write them to path as JSON.
+
+    Args:
+        counts (dict): table name -> counts, as from validate_pandas() / rule_counts_spark().
+    """
+    for table, table_counts in counts.items():
+        logging.info(f"{table}: {table_counts['rejected']} of {table_counts['rows']} rows quarantined")
+        for rule, failures in table_counts["rules"].items():
+            if failures:
+                logging.warning(f"{table}: {failures} rows failed {rule}")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"generated": datetime.now().isoformat(timespec="seconds"), "tables": counts}, f, indent=2)
+    os.replace(tmp_path, path)
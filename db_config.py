@@ -0,0 +1,45 @@
+# MySQL settings shared by the ETL and the console/report modules.
+# Environment variables for sensitive information, defaults match the local setup.
+
+import os
+import socket
+
+DB_HOST = os.getenv('MYSQL_HOST', 'localhost')
+DB_PORT = int(os.getenv('MYSQL_PORT', '3306'))
+DB_USER = os.getenv('MYSQL_USER', 'root')
+DB_PASSWORD = os.getenv('MYSQL_PASSWORD', 'password')
+DB_NAME = os.getenv('MYSQL_DATABASE', 'creditcard_capstone')
+
+JDBC_URL = f"jdbc:mysql://{DB_HOST}:{DB_PORT}/{DB_NAME}"
+SQLALCHEMY_URL = f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+JDBC_PROPERTIES = {
+    "user": DB_USER,
+    "password": DB_PASSWORD,
+    "driver": "com.mysql.cj.jdbc.Driver"
+}
+
+
+def mysql_available(timeout=1.0):
+    """
+    Return True if something is listening on the configured MySQL host and port.
+    """
+    try:
+        with socket.create_connection((DB_HOST, DB_PORT), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+def connect():
+    """
+    Open a new mysql.connector connection to the capstone database.
+    """
+    # Imported here so the Spark-only paths run without mysql-connector-python
+    import mysql.connector
+    return mysql.connector.connect(
+        host=DB_HOST,
+        port=DB_PORT,
+        user=DB_USER,
+        password=DB_PASSWORD,
+        database=DB_NAME
+    )
@@ -0,0 +1,167 @@
+# Checkpointed, resumable ETL stages.
+#
+# A failed load used to mean running extract and transform again from scratch.
+# CheckpointRunner records in watermarks.json, for every completed stage, a
+# fingerprint of its input files and of the files it produced. A stage is
+# skipped when its inputs and parameters are unchanged and its outputs are still
+# on disk as it left them. Stages chain through files (e.g. the staged Parquet
+# of the transform is the input of the load), so a changed source re-runs
+# everything downstream of it, and a rerun after a crash repeats only the stage
+# that failed. Stages without input files (an API fetch) run on every new run,
+# and are skipped only when resuming a run that stopped after them.
+#
+# Source files are fingerprinted by content (SHA-256, recomputed only when their
+# size or mtime changes); directories written by the stages themselves by the
+# size and mtime of their files.
+
+import hashlib
+import logging
+import os
+from datetime import datetime
+
+from watermark_store import WATERMARK_FILE, load_watermarks, update_watermarks
+
+# Key of the checkpoints in watermarks.json: job -> {"status", "run", "stages"}
+CHECKPOINTS_KEY = "ETL_CHECKPOINTS"
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def fingerprint(path, previous=None):
+    """
+    Fingerprint a file (by content) or a directory tree (by file sizes and mtimes).
+
+    Args:
+        path (str): File or directory.
+        previous (dict): An earlier fingerprint of path; its hash is reused when
+            the file's size and mtime have not changed.
+
+    Returns:
+        dict: The fingerprint, or None when path does not exist.
+    """
+    if os.path.isfile(path):
+        stat = os.stat(path)
+        if previous and previous.get("size") == stat.st_size and previous.get("mtime_ns") == stat.st_mtime_ns:
+            sha256 = previous["sha256"]
+        else:
+            sha256 = _sha256(path)
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": sha256}
+    if os.path.isdir(path):
+        digest = hashlib.sha1()
+        files = 0
+        for root, dirs, names in os.walk(path):
+            dirs.sort()
+            for name in sorted(names):
+                file_path = os.path.join(root, name)
+                stat = os.stat(file_path)
+                digest.update(f"{os.path.relpath(file_path, path)}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode())
+                files += 1
+        return {"files": files, "digest": digest.hexdigest()}
+    return None
+
+
+def _identity(fp):
+    # What has to match for a path to count as unchanged
+    if fp is None:
+        return None
+    return fp.get("sha256") or fp.get("digest")
+
+
+class CheckpointRunner:
+    """
+    Runs the stages of one ETL job, skipping those whose inputs have not changed.
+
+    Use as a context manager: the run is marked complete when the with block
+    ends without an exception, and resumed by the next run otherwise.
+
+    Args:
+        job (str): Job name; every job keeps its own checkpoints.
+        force (bool): Ignore the recorded checkpoints and run every stage.
+        path (str): File holding the checkpoints.
+    """
+
+    def __init__(self, job, force=False, path=WATERMARK_FILE):
+        self.job = job
+        self.path = path
+        state = load_watermarks(path).get(CHECKPOINTS_KEY, {}).get(job, {})
+        self.resuming = state.get("status") == "running" and not force
+        # A resumed run keeps the id of the interrupted one
+        self.run_id = (state.get("run") if self.resuming else None) or datetime.now().isoformat()
+        self.stages = {} if force else state.get("stages", {})
+        self.skipped = []
+        if self.resuming:
+            logging.info(f"{job}: resuming the interrupted run")
+
+    def _save(self, status):
+        with update_watermarks(self.path) as watermarks:
+            watermarks.setdefault(CHECKPOINTS_KEY, {})[self.job] = {
+                "status": status, "run": self.run_id, "stages": self.stages}
+
+    def __enter__(self):
+        self._save("running")
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self._save("complete")
+        else:
+            logging.error(f"{self.job} failed; run it again to resume from the failed stage")
+
+    def _up_to_date(self, saved, inputs, outputs, params):
+        if saved is None or saved.get("params") != params:
+            return False
+        # Nothing tells whether the source of an input-less stage changed: only
+        # the interrupted run itself may skip it
+        if not inputs and saved.get("run") != self.run_id:
+            return False
+        if set(saved["inputs"]) != set(inputs) or set(saved["outputs"]) != set(outputs):
+            return False
+        if any(_identity(fp) != _identity(saved["inputs"][path]) for path, fp in inputs.items()):
+            return False
+        for path in outputs:
+            current = _identity(fingerprint(path))
+            if current is None or current != _identity(saved["outputs"][path]):
+                return False
+        return True
+
+    def stage(self, name, func, inputs=(), outputs=(), params=None):
+        """
+        Run func as stage name unless it is up to date.
+
+        Args:
+            name (str): Stage name.
+            func (callable): Runs the stage; its return value (JSON-serializable) is recorded.
+            inputs (list): Files or directories the stage reads.
+            outputs (list): Files or directories the stage writes.
+            params (dict): Settings that change the stage's result (e.g. the load mode).
+
+        Returns:
+            The value func returned, now or when the stage last ran.
+        """
+        saved = self.stages.get(name)
+        previous_inputs = saved["inputs"] if saved else {}
+        input_fps = {path: fingerprint(path, previous_inputs.get(path)) for path in inputs}
+        if self._up_to_date(saved, input_fps, list(outputs), params):
+            logging.info(f"{self.job}: {name} is up to date, skipping it")
+            self.skipped.append(name)
+            return saved.get("result")
+
+        result = func()
+        self.stages[name] = {
+            "inputs": input_fps,
+            "outputs": {path: fingerprint(path) for path in outputs},
+            "params": params,
+            "result": result,
+            "run": self.run_id,
+            "completed": datetime.now().isoformat(timespec="seconds"),
+        }
+        self._save("running")
+        return result
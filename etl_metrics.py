@@ -0,0 +1,243 @@
+# Stage timings and row counts of the ETL jobs, as JSON lines.
+#
+# log_progress() only records "phase Started" / "phase Ended" lines, so the
+# duration, size and memory use of a stage cannot be told from the log. Both
+# ETLs (the glob ETL and credit_card_etl.py) wrap their stages in
+# run(...).stage(...). Every stage appends one JSON object to etl_metrics.jsonl
+# with its wall and CPU time, rows in and out, bytes read, the change in resident
+# memory (RSS) from the start to the end of the stage and the peak RSS of the
+# process so far. The peak never goes down from one stage to the next, so it
+# shows the run's high-water mark; the change shows which stage used the memory. The summary command aggregates the runs per job and stage, and
+# flags stages whose last run was much slower than usual:
+#     python etl_metrics.py summary
+#     python etl_metrics.py summary --job credit_card_etl --threshold 1.25
+#
+# CPU time is that of this Python process; for Spark stages most of the work runs
+# in the JVM, so compare their wall times.
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+METRICS_FILE = os.environ.get("ETL_METRICS_FILE", "etl_metrics.jsonl")
+
+# A last run slower than this multiple of the median is reported as a regression
+REGRESSION_THRESHOLD = 1.5
+
+
+def process_peak_rss_mb():
+    """
+    Return the peak resident set size of this process so far, in MiB (None if unknown).
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def current_rss_mb():
+    """
+    Return the current resident set size of this process, in MiB (None if unknown: Linux only).
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+def file_bytes(paths):
+    """
+    Return the total size in bytes of the files in paths that exist.
+    """
+    return sum(os.path.getsize(path) for path in paths if os.path.isfile(path))
+
+
+class Stage:
+    """
+    Measurements of one stage; set rows_in, rows_out and bytes_read inside the with block.
+    """
+
+    def __init__(self, name, rows_in=None, bytes_read=None):
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.bytes_read = bytes_read
+
+
+class Run:
+    """
+    One run of an ETL job, appending a JSON line per stage to the metrics file.
+
+    Args:
+        job (str): Job name, e.g. "glob_etl".
+        path (str): JSON lines file to append to.
+    """
+
+    def __init__(self, job, path=METRICS_FILE):
+        self.job = job
+        self.run_id = uuid.uuid4().hex[:12]
+        self.path = path
+        self._file = None
+
+    def _write(self, record):
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8", buffering=1)
+        self._file.write(json.dumps(record) + "\n")
+
+    @contextmanager
+    def stage(self, name, rows_in=None, bytes_read=None):
+        """
+        Measure the with block as stage name of this run.
+
+        Yields:
+            Stage: Set its rows_in / rows_out / bytes_read before the block ends.
+        """
+        stage = Stage(name, rows_in, bytes_read)
+        started = datetime.now()
+        wall, cpu = time.perf_counter(), time.process_time()
+        rss = current_rss_mb()
+        status, error = "ok", None
+        try:
+            yield stage
+        except BaseException as e:
+            status, error = "error", f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            rss_end = current_rss_mb()
+            self._write({
+                "job": self.job,
+                "run_id": self.run_id,
+                "stage": name,
+                "started": started.isoformat(timespec="seconds"),
+                "wall_s": round(time.perf_counter() - wall, 4),
+                "cpu_s": round(time.process_time() - cpu, 4),
+                "rows_in": stage.rows_in,
+                "rows_out": stage.rows_out,
+                "bytes_read": stage.bytes_read,
+                "rss_delta_mb": None if rss is None or rss_end is None else round(rss_end - rss, 1),
+                "process_peak_rss_mb": process_peak_rss_mb(),
+                "status": status,
+                "error": error,
+            })
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+@contextmanager
+def run(job, path=METRICS_FILE):
+    """
+    Record one run of job; the whole with block is recorded as its "total" stage.
+
+    Yields:
+        Run: Use run.stage(...) around each stage.
+    """
+    current = Run(job, path)
+    try:
+        with current.stage("total"):
+            yield current
+    finally:
+        current.close()
+
+
+def read_metrics(path=METRICS_FILE):
+    """
+    Return the stage records of path, oldest first.
+    """
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def summarize(records, threshold=REGRESSION_THRESHOLD):
+    """
+    Aggregate the successful stage records per (job, stage).
+
+    Returns:
+        list: One dict per (job, stage): runs, median / last wall time, median rows out,
+            median RSS change and process peak RSS, and regression (last wall time > threshold x the median of the earlier runs).
+    """
+    groups = {}
+    for record in records:
+        if record.get("status") == "ok":
+            groups.setdefault((record["job"], record["stage"]), []).append(record)
+
+    def median(values):
+        values = [value for value in values if value is not None]
+        return statistics.median(values) if values else None
+
+    summary = []
+    for (job, stage), group in groups.items():
+        walls = [record["wall_s"] for record in group]
+        earlier = median(walls[:-1])
+        summary.append({
+            "job": job,
+            "stage": stage,
+            "runs": len(group),
+            "median_wall_s": median(walls),
+            "last_wall_s": walls[-1],
+            "median_rows_out": median(record["rows_out"] for record in group),
+            "median_rss_delta_mb": median(record.get("rss_delta_mb") for record in group),
+            "median_process_peak_rss_mb": median(record.get("process_peak_rss_mb") for record in group),
+            "regression": bool(earlier) and walls[-1] > threshold * earlier,
+        })
+    return summary
+
+
+def print_summary(summary):
+    def show(value, spec):
+        return "" if value is None else format(value, spec)
+
+    print(f"{'job':<18}{'stage':<22}{'runs':>6}{'median s':>11}{'last s':>10}"
+          f"{'rows out':>12}{'RSS +MiB':>10}{'peak MiB':>10}")
+    for row in summary:
+        flag = "  <- slower than usual" if row["regression"] else ""
+        print(f"{row['job']:<18}{row['stage']:<22}{row['runs']:>6}{row['median_wall_s']:>11.2f}"
+              f"{row['last_wall_s']:>10.2f}{show(row['median_rows_out'], ',.0f'):>12}"
+              f"{show(row['median_rss_delta_mb'], '+.1f'):>10}"
+              f"{show(row['median_process_peak_rss_mb'], '.1f'):>10}{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ETL stage metrics")
+    commands = parser.add_subparsers(dest="command", required=True)
+    summary = commands.add_parser("summary", help="aggregate the recorded runs per job and stage")
+    summary.add_argument("--file", default=METRICS_FILE)
+    summary.add_argument("--job", help="only this job")
+    summary.add_argument("--last", type=int, help="only the last N runs of each job")
+    summary.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                         help="flag a stage whose last run took more than this multiple of its median")
+    args = parser.parse_args()
+
+    records = [record for record in read_metrics(args.file) if not args.job or record["job"] == args.job]
+    if args.last:
+        runs = {}
+        for record in records:
+            runs.setdefault(record["job"], []).append(record["run_id"])
+        keep = {run_id for run_ids in runs.values() for run_id in list(dict.fromkeys(run_ids))[-args.last:]}
+        records = [record for record in records if record["run_id"] in keep]
+    if not records:
+        print(f"No ETL runs recorded in {args.file}")
+        return
+    print_summary(summarize(records, args.threshold))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,93 +1,268 @@
+import argparse
 import glob
+import os
+import numpy as np
 import pandas as pd
 import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 
+import etl_metrics
+from json_stream import iter_json_dataframes, read_json_records
+
 log_file = "log_file.txt"
 target_file = "transformed_data.csv"
 
+columns = ["name", "height", "weight"]
+
+# Files per process-pool task; small files are cheaper to parse than to ship one by one
+FILES_PER_TASK = 8
+
+# Rows per chunk in the streaming (out-of-core) mode
+CHUNK_SIZE = 100000
+
 def extract_from_csv(file_to_process):
     dataframe = pd.read_csv(file_to_process)
     return dataframe
 
 def extract_from_json(file_to_process):
-    dataframe = pd.read_json(file_to_process, lines=True)
+    # Handles both pretty-printed JSON arrays and newline-delimited JSON
+    dataframe = read_json_records(file_to_process)
     return dataframe
 
 def extract_from_xml(file_to_process):
-    dataframe = pd.DataFrame(columns=["name", "height", "weight"])
-    tree = ET.parse(file_to_process)
-    root = tree.getroot()
-    for person in root:
-        name = person.find("name").text
-        height = float(person.find("height").text)
-        weight = float(person.find("weight").text)
-        dataframe = pd.concat([dataframe, pd.DataFrame([{"name": name, "height": height, "weight": weight}])], ignore_index=True)
-    return dataframe
+    return combine(iter_xml_chunks(file_to_process))
 
-def extract():
-    extracted_data = pd.DataFrame(columns=['name', 'height', 'weight'])  # create an empty data frame to hold extracted data
-    
-    # process all csv files
-    for csvfile in glob.glob("*.csv"):
-        extracted_data = pd.concat([extracted_data, extract_from_csv(csvfile)], ignore_index=True)
-        
-    # process all json files
-    for jsonfile in glob.glob("*.json"):
-        extracted_data = pd.concat([extracted_data, extract_from_json(jsonfile)], ignore_index=True)
-    
-    # process all xml files
-    for xmlfile in glob.glob("*.xml"):
-        extracted_data = pd.concat([extracted_data, extract_from_xml(xmlfile)], ignore_index=True)
-        
-    return extracted_data
+def iter_xml_chunks(file_to_process, chunk_size=None):
+    # Stream the document: each <person> is read into the column lists and then
+    # cleared, so neither the tree nor the DataFrame grows one row at a time.
+    # A data frame is yielded every chunk_size rows (once at the end if None).
+    data = {column: [] for column in columns}
+    depth = 0
+    root = None
+    for event, element in ET.iterparse(file_to_process, events=("start", "end")):
+        if event == "start":
+            if root is None:
+                root = element
+            depth += 1
+            continue
+        depth -= 1
+        if depth == 1:  # a child of the root element
+            data["name"].append(element.find("name").text)
+            data["height"].append(float(element.find("height").text))
+            data["weight"].append(float(element.find("weight").text))
+            root.clear()
+            if chunk_size and len(data["name"]) >= chunk_size:
+                yield pd.DataFrame(data, columns=columns)
+                data = {column: [] for column in columns}
+    if data["name"] or not chunk_size:
+        yield pd.DataFrame(data, columns=columns)
+
+def iter_csv_chunks(file_to_process, chunk_size):
+    yield from pd.read_csv(file_to_process, chunksize=chunk_size)
+
+def iter_json_chunks(file_to_process, chunk_size):
+    yield from iter_json_dataframes(file_to_process, chunk_size)
+
+extractors = {
+    ".csv": extract_from_csv,
+    ".json": extract_from_json,
+    ".xml": extract_from_xml,
+}
+
+chunk_readers = {
+    ".csv": iter_csv_chunks,
+    ".json": iter_json_chunks,
+    ".xml": iter_xml_chunks,
+}
+
+def source_files(output_file=target_file):
+    # Every csv, json and xml file in the working directory, except our own outputs
+    outputs = {os.path.abspath(target_file), os.path.abspath(output_file)}
+    for extension in extractors:
+        for path in sorted(glob.glob("*" + extension)):
+            if os.path.abspath(path) not in outputs:
+                yield path
+
+def extract_file(file_to_process):
+    return extractors[os.path.splitext(file_to_process)[1]](file_to_process)
+
+def extract(workers=None, output_file=target_file):
+    '''Extract every source file, in parallel across worker processes,
+    and build the combined data frame with a single concat '''
+    files = list(source_files(output_file))
+    workers = min(workers or os.cpu_count() or 1, len(files) or 1)
+    if workers == 1:
+        return combine(map(extract_file, files))
+    chunksize = max(1, min(FILES_PER_TASK, len(files) // (workers * 4)))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return combine(executor.map(extract_file, files, chunksize=chunksize))
+
+def combine(frames):
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    # The same fixed set of columns as the streaming mode writes, so both modes
+    # produce the same file from the same sources
+    return pd.concat(frames, ignore_index=True).reindex(columns=columns)
+
+def round_values(values, ndigits):
+    '''Round to ndigits as Python's round() does (the original object-dtype frame),
+    vectorized. numpy rounds value * 10**ndigits, and when that product rounds to
+    exactly .5 it rounds half to even, although the exact product lies on one side
+    (75 in is 1.9050000000000000266 m: 1.91, but 1.9 from numpy). The rounding
+    error of the product (Dekker's two-product) decides those ties. '''
+    scale = 10.0 ** ndigits
+    x = values.to_numpy(dtype="float64")
+    scaled = x * scale
+    rounded = np.rint(scaled)
+    with np.errstate(invalid="ignore"):  # inf - inf
+        ties = np.flatnonzero(scaled - np.floor(scaled) == 0.5)
+    if len(ties):
+        tied, tied_scaled = x[ties], scaled[ties]
+        split = 134217729.0 * tied  # 2**27 + 1
+        high = split - (split - tied)
+        error = (high * scale - tied_scaled) + (tied - high) * scale
+        rounded[ties] = np.where(error > 0, np.ceil(tied_scaled),
+                                 np.where(error < 0, np.floor(tied_scaled), rounded[ties]))
+    return pd.Series(rounded / scale, index=values.index, name=values.name)
 
 def transform(data):
     '''Convert inches to meters and round off to two decimals 
     1 inch is 0.0254 meters '''
-    data['height'] = round(data.height * 0.0254, 2)
+    data['height'] = round_values(data.height * 0.0254, 2)
  
     '''Convert pounds to kilograms and round off to two decimals 
     1 pound is 0.45359237 kilograms '''
-    data['weight'] = round(data.weight * 0.45359237, 2)
+    data['weight'] = round_values(data.weight * 0.45359237, 2)
     
     return data
 
 def load_data(target_file, transformed_data):
     transformed_data.to_csv(target_file, index=False)
 
+def iter_transformed_chunks(chunk_size=CHUNK_SIZE, output_file=target_file):
+    '''Read every source file chunk_size rows at a time and transform each
+    chunk on its own, so memory is bounded by the chunk size, not the input '''
+    for file_to_process in source_files(output_file):
+        reader = chunk_readers[os.path.splitext(file_to_process)[1]]
+        for chunk in reader(file_to_process, chunk_size):
+            # A fixed set of columns, so every chunk appends to the same file layout
+            yield transform(chunk.reindex(columns=columns))
+
+def write_csv_chunks(chunks, path):
+    count = 0
+    header = True
+    with open(path, "w", newline="") as f:
+        for chunk in chunks:
+            chunk.to_csv(f, index=False, header=header)
+            header = False
+            count += len(chunk)
+        if header:
+            pd.DataFrame(columns=columns).to_csv(f, index=False)
+    return count
+
+def write_parquet_chunks(chunks, path):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([("name", pa.string()), ("height", pa.float64()), ("weight", pa.float64())])
+    count = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        for chunk in chunks:
+            chunk = chunk.astype({"name": "object", "height": "float64", "weight": "float64"})
+            # One row group per chunk
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            count += len(chunk)
+    return count
+
+chunk_writers = {
+    "csv": write_csv_chunks,
+    "parquet": write_parquet_chunks,
+}
+
+def stream_etl(output_file, output_format="csv", chunk_size=CHUNK_SIZE):
+    '''Extract, transform and load chunk by chunk, appending to output_file.
+    The file is written under a temporary name and renamed when complete '''
+    tmp_file = output_file + ".tmp"
+    chunks = iter_transformed_chunks(chunk_size, output_file)
+    count = chunk_writers[output_format](chunks, tmp_file)
+    os.replace(tmp_file, output_file)
+    return count
+
+log = None  # opened once, on the first message
+
 def log_progress(message):
+    global log
     timestamp_format = '%Y-%b-%d-%H:%M:%S'  # Year-Monthname-Day-Hour-Minute-Second
     now = datetime.now()  # get current timestamp
     timestamp = now.strftime(timestamp_format)
-    with open(log_file, "a") as f:
-        f.write(timestamp + ',' + message + '\n')
+    if log is None:
+        log = open(log_file, "a", buffering=1)  # line buffered: every message is on disk at once
+    log.write(timestamp + ',' + message + '\n')
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract, transform and load the person files of this directory")
+    parser.add_argument("--chunk-size", type=int,
+                        help=f"stream the files in chunks of this many rows (e.g. {CHUNK_SIZE}) "
+                             "instead of loading them all into memory")
+    parser.add_argument("--format", choices=sorted(chunk_writers), default="csv",
+                        help="output format in streaming mode")
+    parser.add_argument("--output", help=f"output file (default {target_file}, or transformed_data.parquet)")
+    parser.add_argument("--workers", type=int, help="extract processes when not streaming (default: one per CPU)")
+    args = parser.parse_args()
+
+    # Stage timings, row counts and memory go to etl_metrics.jsonl (python etl_metrics.py summary)
+    with etl_metrics.run("glob_etl") as metrics:
+        run_etl(args, metrics)
+
+def run_etl(args, metrics):
+    # Log the initialization of the ETL process
+    log_progress("ETL Job Started")
+
+    if args.chunk_size or args.format != "csv":
+        output_file = args.output or os.path.splitext(target_file)[0] + "." + args.format
+        log_progress("Streaming extract, transform and load Started")
+        with metrics.stage("stream") as stage:
+            stage.bytes_read = etl_metrics.file_bytes(source_files(output_file))
+            stage.rows_out = count = stream_etl(output_file, args.format, args.chunk_size or CHUNK_SIZE)
+        log_progress(f"Streaming extract, transform and load Ended ({count} rows to {output_file})")
+        log_progress("ETL Job Ended")
+        return
 
-# Log the initialization of the ETL process
-log_progress("ETL Job Started")
+    # Log the beginning of the Extraction process
+    log_progress("Extract phase Started")
+    output_file = args.output or target_file
+    with metrics.stage("extract") as stage:
+        stage.bytes_read = etl_metrics.file_bytes(source_files(output_file))
+        extracted_data = extract(args.workers, output_file)
+        stage.rows_out = len(extracted_data)
 
-# Log the beginning of the Extraction process
-log_progress("Extract phase Started")
-extracted_data = extract()
+    # Log the completion of the Extraction process
+    log_progress(f"Extract phase Ended ({len(extracted_data)} rows)")
 
-# Log the completion of the Extraction process
-log_progress("Extract phase Ended")
+    # Log the beginning of the Transformation process
+    log_progress("Transform phase Started")
+    with metrics.stage("transform", rows_in=len(extracted_data)) as stage:
+        transformed_data = transform(extracted_data)
+        stage.rows_out = len(transformed_data)
+    print("Transformed Data")
+    print(transformed_data)
 
-# Log the beginning of the Transformation process
-log_progress("Transform phase Started")
-transformed_data = transform(extracted_data)
-print("Transformed Data")
-print(transformed_data)
+    # Log the completion of the Transformation process
+    log_progress("Transform phase Ended")
 
-# Log the completion of the Transformation process
-log_progress("Transform phase Ended")
+    # Log the beginning of the Loading process
+    log_progress("Load phase Started")
+    with metrics.stage("load", rows_in=len(transformed_data)) as stage:
+        load_data(output_file, transformed_data)
+        stage.rows_out = len(transformed_data)
 
-# Log the beginning of the Loading process
-log_progress("Load phase Started")
-load_data(target_file, transformed_data)
+    # Log the completion of the Loading process
+    log_progress("Load phase Ended")
 
-# Log the completion of the Loading process
-log_progress("Load phase Ended")
+    # Log the completion of the ETL process
+    log_progress("ETL Job Ended")
 
-# Log the completion of the ETL process
-log_progress("ETL Job Ended")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+# Batched, parallel JDBC load stage with a per-table throughput report.
+#
+# The section 1.2 and 4.3 writes used Spark's defaults: no batchsize, no
+# rewriteBatchedStatements, and whatever partitioning the DataFrame happened to
+# have. write_table() repartitions by a key so every partition writes its own
+# batch of INSERTs in parallel. When MySQL is not reachable the same load runs
+# against a local SQLite file, so the benchmark works on any Linux box.
+
+import argparse
+import logging
+import os
+import time
+
+import pyspark.sql.functions as F
+
+from db_config import JDBC_PROPERTIES, JDBC_URL, mysql_available
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+NUM_PARTITIONS = 8
+BATCH_SIZE = 10000
+
+# Coordinates of the SQLite JDBC driver, fetched by Spark when the stand-in is used
+SQLITE_PACKAGE = "org.xerial:sqlite-jdbc:3.46.0.0"
+SQLITE_FILE = "loader_benchmark.db"
+
+# table -> column used to spread rows over the writer partitions
+PARTITION_KEYS = {
+    "CDW_SAPP_BRANCH": "BRANCH_CODE",
+    "CDW_SAPP_CREDIT_CARD": "BRANCH_CODE",
+    "CDW_SAPP_CUSTOMER": "SSN",
+    "CDW_SAPP_loan_application": "Application_ID",
+}
+
+
+def mysql_target(url=JDBC_URL, properties=JDBC_PROPERTIES):
+    """
+    Return the (url, properties) of the MySQL database with batched statement rewriting enabled.
+
+    rewriteBatchedStatements makes Connector/J send each JDBC batch as one
+    multi-row INSERT instead of one round trip per row.
+    """
+    separator = "&" if "?" in url else "?"
+    return url + separator + "rewriteBatchedStatements=true", dict(properties)
+
+
+def sqlite_target(path=SQLITE_FILE):
+    """
+    Return the (url, properties) of a local SQLite stand-in database.
+
+    SQLite allows a single writer at a time, so the busy timeout makes parallel
+    partitions wait for the lock instead of failing.
+    """
+    return f"jdbc:sqlite:{path}", {"driver": "org.sqlite.JDBC", "busy_timeout": "60000"}
+
+
+def default_target():
+    """
+    Return the MySQL target when the server is reachable, otherwise the SQLite stand-in.
+
+    Returns:
+        tuple: (name, url, properties)
+    """
+    if mysql_available():
+        return ("mysql",) + mysql_target()
+    logging.info(f"MySQL is not reachable, loading into SQLite file {SQLITE_FILE}")
+    return ("sqlite",) + sqlite_target()
+
+
+def write_table(df, table, url, properties, partition_key=None,
+                num_partitions=NUM_PARTITIONS, batch_size=BATCH_SIZE, mode="overwrite"):
+    """
+    Write df to a JDBC table from num_partitions parallel writers.
+
+    Args:
+        df (DataFrame): The Spark DataFrame to load.
+        table (str): Target table name.
+        url (str): JDBC URL of the database.
+        properties (dict): JDBC connection properties.
+        partition_key (str): Column to repartition by; PARTITION_KEYS[table] by default.
+        num_partitions (int): Number of parallel writer partitions (and JDBC connections).
+        batch_size (int): Rows per JDBC batch.
+        mode (str): Spark save mode.
+
+    Returns:
+        dict: table, rows, seconds and rows_per_sec of the write.
+    """
+    partition_key = partition_key or PARTITION_KEYS.get(table)
+    if partition_key and partition_key in df.columns:
+        df = df.repartition(num_partitions, F.col(partition_key))
+    else:
+        df = df.repartition(num_partitions)
+    df = df.cache()
+    rows = df.count()  # materialize first so only the write is timed
+
+    start = time.perf_counter()
+    # truncate keeps the existing table definition (types, keys, indexes from
+    # schema_bootstrap.py) on overwrite instead of dropping and recreating it
+    df.write \
+        .option("truncate", "true") \
+        .option("batchsize", batch_size) \
+        .option("numPartitions", num_partitions) \
+        .jdbc(url=url, table=table, mode=mode, properties=properties)
+    seconds = time.perf_counter() - start
+    df.unpersist()
+
+    stats = {
+        "table": table,
+        "rows": rows,
+        "seconds": seconds,
+        "rows_per_sec": rows / seconds if seconds > 0 else float("inf"),
+    }
+    logging.info(f"Loaded {rows} rows into {table} in {seconds:.2f} s ({stats['rows_per_sec']:,.0f} rows/s)")
+    return stats
+
+
+def print_report(results):
+    """
+    Print one line of throughput per write.
+    """
+    print(f"\n{'table':<28}{'partitions':>11}{'batchsize':>11}{'rows':>10}{'seconds':>10}{'rows/s':>12}")
+    for r in results:
+        print(f"{r['table']:<28}{r.get('num_partitions', ''):>11}{r.get('batch_size', ''):>11}"
+              f"{r['rows']:>10}{r['seconds']:>10.2f}{r['rows_per_sec']:>12,.0f}")
+
+
+def _synthetic_transactions(spark, rows):
+    # CDW_SAPP_CREDIT_CARD-shaped rows for when cdw_sapp_credit.json is not at hand
+    return spark.range(rows).select(
+        (F.col("id") + 1).cast("int").alias("TRANSACTION_ID"),
+        F.lpad((F.col("id") % 28 + 1).cast("string"), 2, "0").alias("DAY"),
+        F.lpad((F.col("id") % 12 + 1).cast("string"), 2, "0").alias("MONTH"),
+        F.lit(2018).alias("YEAR"),
+        F.format_string("42106533%08d", F.col("id") % 1000).alias("CREDIT_CARD_NO"),
+        (F.col("id") % 1000 + 123456100).cast("int").alias("CUST_SSN"),
+        (F.col("id") % 200 + 1).cast("int").alias("BRANCH_CODE"),
+        F.element_at(F.array(*[F.lit(t) for t in ("Education", "Entertainment", "Grocery", "Gas",
+                                                   "Bills", "Test", "Healthcare")]),
+                     (F.col("id") % 7 + 1).cast("int")).alias("TRANSACTION_TYPE"),
+        F.round(F.rand(42) * 100, 2).alias("TRANSACTION_VALUE"),
+    )
+
+
+def benchmark(partitions=(1, 4, 8), batch_sizes=(1000, 10000), synthetic_rows=0):
+    """
+    Load every available table with each partitions x batchsize combination and print rows/sec.
+
+    Args:
+        partitions (tuple): Writer partition counts to try.
+        batch_sizes (tuple): JDBC batch sizes to try.
+        synthetic_rows (int): Also load this many generated transaction rows.
+
+    Returns:
+        list: One stats dict per write.
+    """
+    # Imported here so the SQLite driver package can be set before the session exists
+    from credit_card_etl import SOURCES, TABLE_NAMES, extract, get_spark_session, transform
+
+    target, url, properties = default_target()
+    spark = get_spark_session("JDBCLoaderBenchmark", packages=SQLITE_PACKAGE if target == "sqlite" else None)
+
+    sources = {name: spec for name, spec in SOURCES.items() if os.path.exists(spec[0])}
+    frames = {TABLE_NAMES[name]: df for name, df in transform(extract(spark, sources)).items()}
+    if synthetic_rows:
+        frames["CDW_SAPP_CREDIT_CARD"] = _synthetic_transactions(spark, synthetic_rows)
+
+    results = []
+    for table, df in frames.items():
+        for num_partitions in partitions:
+            for batch_size in batch_sizes:
+                stats = write_table(df, table, url, properties,
+                                    num_partitions=num_partitions, batch_size=batch_size)
+                stats.update(num_partitions=num_partitions, batch_size=batch_size)
+                results.append(stats)
+
+    print(f"\nJDBC load throughput ({target})")
+    print_report(results)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JDBC load throughput benchmark")
+    parser.add_argument("--partitions", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--synthetic-rows", type=int, default=0,
+                        help="also load this many generated CDW_SAPP_CREDIT_CARD rows")
+    args = parser.parse_args()
+    benchmark(tuple(args.partitions), tuple(args.batch_sizes), args.synthetic_rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+# Incremental reader for the pretty-printed JSON array source files.
+#
+# cdw_sapp_*.json and data.json are single top-level arrays, which Spark can only
+# read with option("multiline", True) (one task per file, whole file in memory)
+# and pandas cannot read with lines=True at all. The functions below decode one
+# record at a time from a fixed-size read buffer, so memory is bounded by the
+# largest record plus the chunk size rather than by the file.
+
+import json
+import os
+
+import pandas as pd
+
+CHUNK_SIZE = 64 * 1024
+BATCH_SIZE = 10000
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\r\n"
+
+
+def iter_json_array(path, chunk_size=CHUNK_SIZE):
+    """
+    Yield the records of a JSON file one at a time.
+
+    A top-level array ("[{...}, {...}]") is decoded element by element; any other
+    file is treated as newline-delimited JSON, so the same reader handles both
+    the source files and the output of json_array_to_ndjson().
+
+    Args:
+        path (str): Path of the JSON file.
+        chunk_size (int): Number of characters read from the file at a time.
+
+    Yields:
+        dict: One decoded record.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        yield from iter_json_stream(f, chunk_size, name=path)
+
+
+def iter_json_stream(f, chunk_size=CHUNK_SIZE, name="<stream>"):
+    """
+    Yield the records of a JSON array or NDJSON text stream, e.g. an HTTP response body.
+
+    Args:
+        f: Text file object to read from.
+        chunk_size (int): Number of characters read at a time.
+        name (str): Name of the source, for error messages.
+
+    Yields:
+        dict: One decoded record.
+    """
+    buf = ""
+    pos = 0
+    eof = False
+
+    def fill():
+        # Drop the consumed prefix and append the next chunk
+        nonlocal buf, pos, eof
+        data = f.read(chunk_size)
+        if not data:
+            eof = True
+        buf = buf[pos:] + data
+        pos = 0
+
+    def skip_whitespace():
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buf) or eof:
+                return
+            fill()
+
+    skip_whitespace()
+    if pos >= len(buf):
+        return
+    in_array = buf[pos] == "["
+    if in_array:
+        pos += 1
+
+    expect_separator = False
+    while True:
+        skip_whitespace()
+        if pos >= len(buf):
+            if in_array:
+                raise ValueError(f"Unterminated JSON array in {name}")
+            return
+        if in_array and buf[pos] == "]":
+            return
+        if in_array and expect_separator:
+            if buf[pos] != ",":
+                raise ValueError(f"Expected ',' or ']' in {name}, found {buf[pos]!r}")
+            pos += 1
+            skip_whitespace()
+
+        while True:
+            try:
+                record, end = _decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                fill()
+                continue
+            # A value that runs to the end of the buffer (e.g. a bare number)
+            # may continue in the next chunk, so only accept it once more data
+            # or EOF confirms where it stops.
+            if end == len(buf) and not eof:
+                fill()
+                continue
+            break
+        pos = end
+        expect_separator = True
+        yield record
+
+
+def iter_json_batches(path, batch_size=BATCH_SIZE, chunk_size=CHUNK_SIZE):
+    """
+    Yield the records of a JSON file in lists of at most batch_size records.
+
+    Args:
+        path (str): Path of the JSON file.
+        batch_size (int): Maximum number of records per batch.
+        chunk_size (int): Number of characters read from the file at a time.
+
+    Yields:
+        list: A batch of decoded records.
+    """
+    return batched(iter_json_array(path, chunk_size), batch_size)
+
+
+def batched(records, batch_size=BATCH_SIZE):
+    """
+    Group an iterable of records into lists of at most batch_size records.
+    """
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def iter_json_dataframes(path, batch_size=BATCH_SIZE, columns=None):
+    """
+    Yield a JSON file as pandas DataFrames of at most batch_size rows.
+
+    Args:
+        path (str): Path of the JSON file.
+        batch_size (int): Maximum number of rows per DataFrame.
+        columns (list): Optional column list; missing keys become NaN.
+
+    Yields:
+        DataFrame: One batch of records.
+    """
+    for batch in iter_json_batches(path, batch_size):
+        yield pd.DataFrame.from_records(batch, columns=columns)
+
+
+def read_json_records(path, columns=None):
+    """
+    Read a whole JSON array (or NDJSON) file into a single pandas DataFrame.
+
+    Args:
+        path (str): Path of the JSON file.
+        columns (list): Optional column list; missing keys become NaN.
+
+    Returns:
+        DataFrame: All records of the file.
+    """
+    return pd.DataFrame.from_records(iter_json_array(path), columns=columns)
+
+
+def json_array_to_ndjson(src_path, dst_path):
+    """
+    Convert a JSON array file to newline-delimited JSON.
+
+    Spark reads NDJSON without the multiline option, so the file can be split
+    across tasks instead of being parsed by a single core.
+
+    Args:
+        src_path (str): Path of the JSON array file.
+        dst_path (str): Path of the NDJSON file to write.
+
+    Returns:
+        int: Number of records written.
+    """
+    count = 0
+    tmp_path = dst_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as out:
+        for record in iter_json_array(src_path):
+            out.write(json.dumps(record, separators=(",", ":")))
+            out.write("\n")
+            count += 1
+    os.replace(tmp_path, dst_path)
+    return count
+
+
+def ensure_ndjson(src_path, staging_dir="staging"):
+    """
+    Return an up-to-date NDJSON copy of src_path, converting it only when the source is newer.
+
+    Args:
+        src_path (str): Path of the JSON array file.
+        staging_dir (str): Directory holding the converted files.
+
+    Returns:
+        str: Path of the NDJSON file.
+    """
+    os.makedirs(staging_dir, exist_ok=True)
+    base = os.path.splitext(os.path.basename(src_path))[0]
+    dst_path = os.path.join(staging_dir, base + ".ndjson")
+    if not os.path.exists(dst_path) or os.path.getmtime(dst_path) < os.path.getmtime(src_path):
+        json_array_to_ndjson(src_path, dst_path)
+    return dst_path
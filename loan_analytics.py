@@ -0,0 +1,147 @@
+# Approval and rejection statistics of the loan applications, computed in SQL.
+#
+# Sections 5.1 and 5.2 used to fetchall() every row of CDW_SAPP_loan_application
+# and filter and count in pandas to get two numbers. Here one grouped query
+# returns the application, approved and rejected counts per combination of the
+# requested dimensions. That is a few hundred rows at most, however large the
+# table grows. cube() then rolls them up to every subset of the dimensions, with
+# 'ALL' marking the dimensions that are summed over. It does this in pandas,
+# because MySQL has ROLLUP but no CUBE. The queries run on the report backend
+# (report_backend.py), so they work on MySQL or the staged Parquet files and
+# share the report cache.
+
+import argparse
+from itertools import combinations
+
+import pandas as pd
+
+from report_backend import cache, default_backend_name, get_backend
+
+LOAN_TABLE = "CDW_SAPP_loan_application"
+
+DIMENSIONS = ["Gender", "Married", "Self_Employed", "Education", "Property_Area", "Income", "Credit_History"]
+
+ALL = "ALL"
+
+APPROVED, REJECTED = "Y", "N"
+
+COUNTS = ["APPLICATIONS", "APPROVED", "REJECTED"]
+
+
+def _grouped_query(dimensions):
+    unknown = set(dimensions) - set(DIMENSIONS)
+    if unknown:
+        raise ValueError(f"Unknown loan dimensions: {sorted(unknown)}")
+    columns = ", ".join(dimensions)
+    select = f"{columns}, " if dimensions else ""
+    group_by = f" GROUP BY {columns}" if dimensions else ""
+    return (
+        f"SELECT {select}COUNT(*) AS APPLICATIONS, "
+        f"SUM(CASE WHEN Application_Status = '{APPROVED}' THEN 1 ELSE 0 END) AS APPROVED, "
+        f"SUM(CASE WHEN Application_Status = '{REJECTED}' THEN 1 ELSE 0 END) AS REJECTED "
+        f"FROM {LOAN_TABLE}{group_by}"
+    )
+
+
+def _with_rates(df):
+    applications = df["APPLICATIONS"].where(df["APPLICATIONS"] > 0)
+    df["APPROVAL_RATE"] = (df["APPROVED"] / applications * 100).fillna(0.0)
+    df["REJECTION_RATE"] = (df["REJECTED"] / applications * 100).fillna(0.0)
+    return df
+
+
+def approval_counts(dimensions=DIMENSIONS, backend=None, use_cache=True):
+    """
+    Count applications, approvals and rejections per combination of dimensions, in one grouped query.
+
+    Args:
+        dimensions (list): Columns of DIMENSIONS to group by.
+        backend (str): Report backend name; REPORT_BACKEND / default_backend_name() when None.
+        use_cache (bool): Serve the result from the report cache when still valid.
+
+    Returns:
+        DataFrame: The dimensions plus APPLICATIONS, APPROVED and REJECTED.
+    """
+    dimensions = list(dimensions)
+    name = backend or default_backend_name()
+    sql = _grouped_query(dimensions)
+
+    def compute():
+        df = get_backend(name).query(sql)
+        df[COUNTS] = df[COUNTS].fillna(0).astype("int64")
+        return df
+
+    if not use_cache:
+        return compute()
+    return cache.get_or_compute((name, "loan_counts", tuple(dimensions)), compute).copy()
+
+
+def cube(dimensions=DIMENSIONS, backend=None):
+    """
+    Approval and rejection rates for every subset of dimensions (a CUBE).
+
+    Args:
+        dimensions (list): Columns of DIMENSIONS.
+        backend (str): Report backend name.
+
+    Returns:
+        DataFrame: One row per subset and value combination; the dimensions a row
+            sums over hold 'ALL'. Columns: the dimensions, APPLICATIONS, APPROVED,
+            REJECTED, APPROVAL_RATE and REJECTION_RATE (percent).
+    """
+    dimensions = list(dimensions)
+    counts = approval_counts(dimensions, backend)
+    levels = []
+    for size in range(len(dimensions), -1, -1):
+        for subset in combinations(dimensions, size):
+            if subset:
+                level = counts.groupby(list(subset), dropna=False)[COUNTS].sum().reset_index()
+            else:
+                level = counts[COUNTS].sum().to_frame().T
+            for dimension in dimensions:
+                if dimension not in subset:
+                    level[dimension] = ALL
+            levels.append(level[dimensions + COUNTS])
+    return _with_rates(pd.concat(levels, ignore_index=True))
+
+
+def rates(backend=None, **filters):
+    """
+    Approval and rejection statistics of the applications matching filters.
+
+    Example: rates(Gender="Male", Married="Yes").
+
+    Args:
+        backend (str): Report backend name.
+        **filters: Dimension -> required value.
+
+    Returns:
+        dict: applications, approved, rejected, approval_rate and rejection_rate (percent).
+    """
+    counts = approval_counts(sorted(filters), backend)
+    for dimension, value in filters.items():
+        counts = counts[counts[dimension] == value]
+    totals = {column.lower(): int(counts[column].sum()) for column in COUNTS}
+    applications = totals["applications"]
+    totals["approval_rate"] = totals["approved"] / applications * 100 if applications else 0.0
+    totals["rejection_rate"] = totals["rejected"] / applications * 100 if applications else 0.0
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Loan application approval rates by applicant attributes")
+    # No choices=: argparse checks the empty list against them too and rejects a plain run
+    parser.add_argument("dimensions", nargs="*", metavar="DIMENSION",
+                        help=f"dimensions to break down by (default: all of {', '.join(DIMENSIONS)})")
+    parser.add_argument("--backend", help="report backend (default: REPORT_BACKEND)")
+    args = parser.parse_args()
+    unknown = [dimension for dimension in args.dimensions if dimension not in DIMENSIONS]
+    if unknown:
+        parser.error(f"invalid dimension: {', '.join(unknown)} (choose from {', '.join(DIMENSIONS)})")
+
+    with pd.option_context("display.max_rows", None, "display.width", 200):
+        print(cube(args.dimensions or DIMENSIONS, args.backend))
+
+
+if __name__ == "__main__":
+    main()
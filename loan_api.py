@@ -0,0 +1,349 @@
+# HTTP client for the loan application API (functional requirements 4.1 - 4.3).
+#
+# fetch_data_from_api() made one blocking requests.get with no timeout or retry
+# and held the whole JSON body in memory before spark.createDataFrame(data).
+# LoanAPIClient reuses a pooled session, retries transient failures with
+# exponential backoff (restarting a download broken off mid-body), and sends the
+# ETag / Last-Modified of the last loaded body, so an unchanged dataset (HTTP 304)
+# skips the reload. The body is decoded
+# record by record as it streams in and handed on in batches, or written to an
+# NDJSON file that Spark reads with an explicit schema.
+#
+# LocalLoanAPI serves data.json over HTTP with the same caching headers, so the
+# client can be exercised without network access:
+#     python loan_api.py --serve                 # stand-in on http://127.0.0.1:8000/
+#     python loan_api.py --url http://127.0.0.1:8000/data.json
+
+import argparse
+import email.utils
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+
+from json_stream import BATCH_SIZE, batched, iter_json_stream
+from watermark_store import WATERMARK_FILE, load_watermarks, update_watermarks
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+API_URL = "https://raw.githubusercontent.com/platformps/LoanDataset/main/loan_data.json"
+
+# (connect, read) seconds
+TIMEOUT = (5, 30)
+RETRIES = 5
+BACKOFF = 0.5
+MAX_BACKOFF = 30
+POOL_SIZE = 4
+# Statuses worth retrying; anything else in 4xx is a permanent error
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Key of the saved ETag / Last-Modified validators in watermarks.json
+VALIDATORS_KEY = "LOAN_API"
+
+
+class NotModified(Exception):
+    """
+    Raised when the server reports the loan data unchanged since the last load (HTTP 304).
+    """
+
+
+class LoanAPIClient:
+    """
+    Pooled, retrying, conditional-GET client for the loan application API.
+
+    Args:
+        url (str): Endpoint returning the JSON array of applications.
+        timeout (tuple): (connect, read) timeouts in seconds.
+        retries (int): Attempts after the first one for connection errors, timeouts and RETRY_STATUSES.
+        backoff (float): First retry delay in seconds; doubled on every further attempt.
+        pool_size (int): Connections kept open per host.
+        watermark_file (str): File holding the validators of the last loaded body.
+    """
+
+    def __init__(self, url=API_URL, timeout=TIMEOUT, retries=RETRIES, backoff=BACKOFF,
+                 pool_size=POOL_SIZE, watermark_file=WATERMARK_FILE):
+        self.url = url
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.watermark_file = watermark_file
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.status_code = None
+        # Validators of the body being fetched; saved by mark_loaded()
+        self._pending = None
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _validators(self):
+        return load_watermarks(self.watermark_file).get(VALIDATORS_KEY) or {}
+
+    def _delay(self, attempt, response):
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), MAX_BACKOFF)
+        return min(self.backoff * 2 ** attempt, MAX_BACKOFF)
+
+    def get(self, conditional=True):
+        """
+        GET the endpoint as a stream, retrying transient failures with exponential backoff.
+
+        Args:
+            conditional (bool): Send If-None-Match / If-Modified-Since from the last loaded body.
+
+        Returns:
+            Response: The open streaming response (status 200).
+
+        Raises:
+            NotModified: The body is unchanged since the last load.
+            requests.RequestException: The request failed permanently or retries ran out.
+        """
+        headers = {"Accept": "application/json"}
+        if conditional:
+            saved = self._validators()
+            if saved.get("etag"):
+                headers["If-None-Match"] = saved["etag"]
+            if saved.get("last_modified"):
+                headers["If-Modified-Since"] = saved["last_modified"]
+
+        for attempt in range(self.retries + 1):
+            response = None
+            try:
+                response = self.session.get(self.url, headers=headers, timeout=self.timeout, stream=True)
+                self.status_code = response.status_code
+                logging.info(f"GET {self.url}: response code {response.status_code}")
+                if response.status_code == 304:
+                    response.close()
+                    raise NotModified(self.url)
+                if response.status_code not in RETRY_STATUSES:
+                    response.raise_for_status()
+                    self._pending = {"etag": response.headers.get("ETag"),
+                                     "last_modified": response.headers.get("Last-Modified")}
+                    return response
+                response.close()
+                error = requests.HTTPError(f"{response.status_code} from {self.url}", response=response)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            if attempt == self.retries:
+                raise error
+            delay = self._delay(attempt, response)
+            logging.warning(f"Attempt {attempt + 1} failed ({error}); retrying in {delay:.1f} s")
+            time.sleep(delay)
+
+    def iter_records(self, conditional=True):
+        """
+        Yield the applications one at a time, decoded as the body streams in.
+
+        Raises:
+            NotModified: The body is unchanged since the last load.
+        """
+        response = self.get(conditional)
+        try:
+            response.raw.decode_content = True
+            text = io.TextIOWrapper(response.raw, encoding=response.encoding or "utf-8")
+            yield from iter_json_stream(text, name=self.url)
+        finally:
+            response.close()
+
+    def iter_batches(self, batch_size=BATCH_SIZE, conditional=True):
+        """
+        Yield the applications in lists of at most batch_size records.
+
+        Raises:
+            NotModified: The body is unchanged since the last load.
+        """
+        return batched(self.iter_records(conditional), batch_size)
+
+    def _write_ndjson(self, path, conditional):
+        count = 0
+        with open(path, "w", encoding="utf-8") as out:
+            for record in self.iter_records(conditional):
+                out.write(json.dumps(record, separators=(",", ":")))
+                out.write("\n")
+                count += 1
+        return count
+
+    def fetch_to_ndjson(self, path, conditional=True):
+        """
+        Stream the applications into an NDJSON file (written atomically) for spark.read.json.
+
+        A download broken off while the body streams in is restarted from the
+        beginning, with the same retries and backoff as get().
+
+        Args:
+            path (str): NDJSON file to write.
+            conditional (bool): Skip the download when the body is unchanged.
+
+        Returns:
+            int: Number of records written, or None when the data is unchanged
+                (the previous file is left as it is).
+        """
+        tmp_path = path + ".tmp"
+        try:
+            for attempt in range(self.retries + 1):
+                try:
+                    count = self._write_ndjson(tmp_path, conditional)
+                    break
+                except urllib3.exceptions.HTTPError as e:
+                    # Raised by the body stream only: get() raises requests' own errors
+                    if attempt == self.retries:
+                        raise
+                    delay = self._delay(attempt, None)
+                    logging.warning(f"Download attempt {attempt + 1} broke off ({e}); "
+                                    f"restarting in {delay:.1f} s")
+                    time.sleep(delay)
+            os.replace(tmp_path, path)
+            return count
+        except NotModified:
+            logging.info(f"Loan data unchanged since the last load, skipping {path}")
+            return None
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    @property
+    def pending_validators(self):
+        """
+        ETag / Last-Modified of the fetched body not yet marked loaded (None if there is none).
+        """
+        return self._pending
+
+    def mark_loaded(self, validators=None):
+        """
+        Persist the validators of the last fetched body. Call once it has been loaded, so a failed
+        load is retried with a full GET instead of being skipped as unchanged.
+
+        Args:
+            validators (dict): pending_validators of a body fetched by an earlier process,
+                e.g. when a checkpointed run resumes at the load.
+        """
+        validators = validators or self._pending
+        if validators is None:
+            return
+        with update_watermarks(self.watermark_file) as watermarks:
+            watermarks[VALIDATORS_KEY] = validators
+        self._pending = None
+
+
+class LocalLoanAPI:
+    """
+    Local HTTP stand-in for the loan API serving a JSON file, with ETag / Last-Modified support.
+
+    Args:
+        path (str): File to serve.
+        host (str): Interface to bind.
+        port (int): Port to bind; 0 picks a free one.
+        fail_first (int): Answer the first fail_first requests with 503, to exercise the retries.
+    """
+
+    def __init__(self, path="data.json", host="127.0.0.1", port=0, fail_first=0):
+        self.path = path
+        self.failures_left = fail_first
+        self.requests = 0
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                api.requests += 1
+                if self.path.split("?")[0] not in ("/", "/" + os.path.basename(api.path)):
+                    self.send_error(404)
+                    return
+                if api.failures_left > 0:
+                    api.failures_left -= 1
+                    self.send_error(503)
+                    return
+                with open(api.path, "rb") as f:
+                    body = f.read()
+                etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+                mtime = os.path.getmtime(api.path)
+                last_modified = email.utils.formatdate(mtime, usegmt=True)
+                since = self.headers.get("If-Modified-Since")
+                unchanged = (self.headers.get("If-None-Match") == etag if self.headers.get("If-None-Match")
+                             else since is not None and
+                             email.utils.parsedate_to_datetime(since).timestamp() >= int(mtime))
+                if unchanged:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", etag)
+                self.send_header("Last-Modified", last_modified)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logging.debug(format % args)
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/{os.path.basename(self.path)}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch the loan application data")
+    parser.add_argument("--url", default=API_URL)
+    parser.add_argument("--output", default=os.path.join("staging", "loan_data.ndjson"))
+    parser.add_argument("--force", action="store_true", help="ignore the saved ETag / Last-Modified")
+    parser.add_argument("--serve", action="store_true", help="serve data.json locally instead of fetching")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    if args.serve:
+        api = LocalLoanAPI(port=args.port)
+        print(f"Serving {api.path} at {api.url}")
+        api.server.serve_forever()
+        return
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with LoanAPIClient(args.url) as client:
+        # The saved validators are those of the last load into MySQL: a 304 only
+        # means that load is current, so without an output file to keep, fetch it all.
+        # Nothing is loaded here, so the validators are not saved (see mark_loaded)
+        conditional = not args.force and os.path.exists(args.output)
+        count = client.fetch_to_ndjson(args.output, conditional=conditional)
+        if count is not None:
+            logging.info(f"Wrote {count} applications to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
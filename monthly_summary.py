@@ -0,0 +1,153 @@
+# Precomputed card-by-month aggregates for bill generation.
+#
+# generate_monthly_bill used to SUM the raw CDW_SAPP_CREDIT_CARD rows of a card
+# and month on every request. CDW_SAPP_CARD_MONTHLY_SUMMARY holds one row per
+# (CREDIT_CARD_NO, YEAR, MONTH, TRANSACTION_TYPE) plus a TRANSACTION_TYPE = 'ALL'
+# row with the month total, so a bill is a single primary-key lookup. After the
+# first build, refresh() only recomputes the card-months touched by transactions
+# loaded since the previous refresh.
+
+import argparse
+import logging
+
+from db_config import connect
+from watermark_store import load_watermarks, update_watermarks
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+SUMMARY_TABLE = "CDW_SAPP_CARD_MONTHLY_SUMMARY"
+ALL_TYPES = "ALL"
+
+CREATE_SUMMARY = f"""
+CREATE TABLE IF NOT EXISTS {SUMMARY_TABLE} (
+    CREDIT_CARD_NO VARCHAR(16) NOT NULL,
+    YEAR INT NOT NULL,
+    MONTH CHAR(2) NOT NULL,
+    TRANSACTION_TYPE VARCHAR(32) NOT NULL,
+    TOTAL_VALUE DOUBLE NOT NULL,
+    TRANSACTION_COUNT INT NOT NULL,
+    PRIMARY KEY (CREDIT_CARD_NO, YEAR, MONTH, TRANSACTION_TYPE),
+    INDEX IDX_SUMMARY_MONTH (YEAR, MONTH, TRANSACTION_TYPE, CREDIT_CARD_NO)
+)
+"""
+
+# One scan: per-type rows and, through ROLLUP, the per-month 'ALL' total.
+# Higher rollup levels (whole card, whole table) are dropped by the HAVING.
+_AGGREGATE = f"""
+SELECT cc.CREDIT_CARD_NO, cc.YEAR, cc.MONTH,
+       IF(GROUPING(cc.TRANSACTION_TYPE), '{ALL_TYPES}', COALESCE(cc.TRANSACTION_TYPE, '')),
+       SUM(cc.TRANSACTION_VALUE), COUNT(*)
+FROM CDW_SAPP_CREDIT_CARD cc {{join}}
+GROUP BY cc.CREDIT_CARD_NO, cc.YEAR, cc.MONTH, cc.TRANSACTION_TYPE WITH ROLLUP
+HAVING GROUPING(cc.MONTH) = 0
+"""
+
+INSERT_ALL = f"INSERT INTO {SUMMARY_TABLE} " + _AGGREGATE.format(join="")
+
+INSERT_AFFECTED = f"INSERT INTO {SUMMARY_TABLE} " + _AGGREGATE.format(
+    join="JOIN summary_refresh_keys k "
+         "ON k.CREDIT_CARD_NO = cc.CREDIT_CARD_NO AND k.YEAR = cc.YEAR AND k.MONTH = cc.MONTH")
+
+LATEST_TRANSACTION = """
+SELECT TIMEID, TRANSACTION_ID FROM CDW_SAPP_CREDIT_CARD
+ORDER BY TIMEID DESC, TRANSACTION_ID DESC LIMIT 1
+"""
+
+
+def _latest(cursor):
+    cursor.execute(LATEST_TRANSACTION)
+    row = cursor.fetchone()
+    return None if row is None else {"TIMEID": row[0], "TRANSACTION_ID": row[1]}
+
+
+def rebuild(cursor):
+    """
+    Recompute the whole summary table from CDW_SAPP_CREDIT_CARD.
+    """
+    cursor.execute(CREATE_SUMMARY)
+    cursor.execute(f"DELETE FROM {SUMMARY_TABLE}")
+    cursor.execute(INSERT_ALL)
+    return cursor.rowcount
+
+
+def refresh_since(cursor, since, until):
+    """
+    Recompute only the card-months with transactions after since, up to until.
+
+    Args:
+        cursor: Open cursor; the caller commits.
+        since (dict): Previous watermark, {"TIMEID": ..., "TRANSACTION_ID": ...}.
+        until (dict): Watermark of the latest loaded transaction.
+
+    Returns:
+        int: Number of summary rows written.
+    """
+    cursor.execute(CREATE_SUMMARY)
+    cursor.execute("DROP TEMPORARY TABLE IF EXISTS summary_refresh_keys")
+    cursor.execute(
+        "CREATE TEMPORARY TABLE summary_refresh_keys "
+        "(PRIMARY KEY (CREDIT_CARD_NO, YEAR, MONTH)) "
+        "SELECT DISTINCT CREDIT_CARD_NO, YEAR, MONTH FROM CDW_SAPP_CREDIT_CARD "
+        "WHERE (TIMEID, TRANSACTION_ID) > (%s, %s) AND (TIMEID, TRANSACTION_ID) <= (%s, %s)",
+        (since["TIMEID"], since["TRANSACTION_ID"], until["TIMEID"], until["TRANSACTION_ID"]))
+    cursor.execute(
+        f"DELETE s FROM {SUMMARY_TABLE} s JOIN summary_refresh_keys k "
+        "ON k.CREDIT_CARD_NO = s.CREDIT_CARD_NO AND k.YEAR = s.YEAR AND k.MONTH = s.MONTH")
+    cursor.execute(INSERT_AFFECTED)
+    written = cursor.rowcount
+    cursor.execute("DROP TEMPORARY TABLE summary_refresh_keys")
+    return written
+
+
+def refresh(full=False):
+    """
+    Bring CDW_SAPP_CARD_MONTHLY_SUMMARY up to date with CDW_SAPP_CREDIT_CARD.
+
+    The first run (or full=True) rebuilds the table; later runs only recompute
+    the card-months of transactions loaded since the last refresh. The position
+    of the last summarized transaction is kept in watermarks.json.
+
+    Args:
+        full (bool): Rebuild the whole table.
+
+    Returns:
+        int: Number of summary rows written.
+    """
+    watermarks = load_watermarks()
+    connection = connect()
+    try:
+        cursor = connection.cursor()
+        latest = _latest(cursor)
+        since = watermarks.get(SUMMARY_TABLE)
+        if latest is None:
+            written = 0
+        elif full or not since:
+            written = rebuild(cursor)
+            logging.info(f"Rebuilt {SUMMARY_TABLE}: {written} rows")
+        elif (latest["TIMEID"], latest["TRANSACTION_ID"]) <= (since["TIMEID"], since["TRANSACTION_ID"]):
+            written = 0
+            logging.info(f"{SUMMARY_TABLE} is up to date")
+        else:
+            written = refresh_since(cursor, since, latest)
+            logging.info(f"Refreshed {SUMMARY_TABLE}: {written} rows for new transactions")
+        connection.commit()
+        cursor.close()
+    finally:
+        connection.close()
+
+    if latest is not None:
+        with update_watermarks() as watermarks:
+            watermarks[SUMMARY_TABLE] = latest
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description=f"Build or refresh {SUMMARY_TABLE}")
+    parser.add_argument("--full", action="store_true", help="rebuild the whole table")
+    args = parser.parse_args()
+    refresh(full=args.full)
+
+
+if __name__ == "__main__":
+    main()
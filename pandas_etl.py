@@ -0,0 +1,344 @@
+# Pure pandas/NumPy implementation of the credit card ETL transforms.
+#
+# For the current data volume, starting a JVM and a SparkSession costs more than
+# the whole transform. These functions reproduce transform_branch,
+# transform_credit and transform_customer from credit_card_etl.py with
+# vectorized pandas string operations (no per-row Python), column for column.
+# Select the engine with `python credit_card_etl.py --engine pandas`.
+
+import argparse
+import logging
+import os
+import time
+
+import pandas as pd
+
+from data_quality import keep_source_pandas, validate_pandas
+from json_stream import read_json_records
+from report_cache import invalidate
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+BRANCH_FILE = "cdw_sapp_branch.json"
+CREDIT_FILE = "cdw_sapp_credit.json"
+CUSTOMER_FILE = "cdw_sapp_customer.json"
+
+# Timestamps are rendered in this zone, matching spark.sql.session.timeZone
+SESSION_TIMEZONE = os.getenv("SPARK_SESSION_TIMEZONE", "UTC")
+
+# Raw column order of each source, the same order as the Spark schemas
+BRANCH_COLUMNS = ["BRANCH_CODE", "BRANCH_NAME", "BRANCH_STREET", "BRANCH_CITY", "BRANCH_STATE",
+                  "BRANCH_ZIP", "BRANCH_PHONE", "LAST_UPDATED"]
+CREDIT_COLUMNS = ["CREDIT_CARD_NO", "DAY", "MONTH", "YEAR", "CUST_SSN", "BRANCH_CODE",
+                  "TRANSACTION_TYPE", "TRANSACTION_VALUE", "TRANSACTION_ID"]
+CUSTOMER_COLUMNS = ["FIRST_NAME", "MIDDLE_NAME", "LAST_NAME", "SSN", "CREDIT_CARD_NO", "APT_NO",
+                    "STREET_NAME", "CUST_CITY", "CUST_STATE", "CUST_COUNTRY", "CUST_ZIP",
+                    "CUST_PHONE", "CUST_EMAIL", "LAST_UPDATED"]
+
+SOURCES = {
+    "branch": (BRANCH_FILE, BRANCH_COLUMNS),
+    "credit": (CREDIT_FILE, CREDIT_COLUMNS),
+    "customer": (CUSTOMER_FILE, CUSTOMER_COLUMNS),
+}
+
+# name -> column the rows are identified by, used to align the two engines' output
+KEYS = {
+    "branch": "BRANCH_CODE",
+    "credit": "TRANSACTION_ID",
+    "customer": "SSN",
+}
+
+
+def _int(s):
+    return pd.to_numeric(s, errors="coerce").astype("Int32")
+
+
+def _str(s):
+    # Numbers become their integer text (55044, not 55044.0); nulls stay null
+    if pd.api.types.is_numeric_dtype(s):
+        s = pd.to_numeric(s, errors="coerce").astype("Int64")
+    return s.astype("string")
+
+
+def _lpad(s, width, pad):
+    # Spark lpad also truncates values longer than width
+    return s.str.rjust(width, pad).str[:width]
+
+
+def _substring(s, pos, length):
+    # Spark substring is 1-based
+    return s.str[pos - 1:pos - 1 + length]
+
+
+def _format_phone(a, b, c):
+    # format_string("(%s)%s-%s", ...) prints a null argument as "null"
+    return "(" + a.fillna("null") + ")" + b.fillna("null") + "-" + c.fillna("null")
+
+
+def _initcap(s):
+    # Spark initcap: lower-case everything, then upper-case the first letter
+    # after each space. Split into word columns so each step stays vectorized.
+    words = s.str.lower().str.split(" ", expand=True)
+    if words.empty:
+        return s.astype("string")
+    result = words[0].astype("string").str.capitalize()
+    for column in words.columns[1:]:
+        word = words[column].astype("string").str.capitalize()
+        result = result.where(word.isna(), result + " " + word)
+    return result
+
+
+def _timestamp(s):
+    ts = pd.to_datetime(s, utc=True, errors="coerce")
+    return ts.dt.tz_convert(SESSION_TIMEZONE).dt.tz_localize(None)
+
+
+def transform_branch(branch_df):
+    """
+    Apply the branch mapping document: pad BRANCH_ZIP and format BRANCH_PHONE as (XXX)XXX-XXXX.
+    """
+    df = branch_df.copy()
+    zip_code = _str(df["BRANCH_ZIP"])
+    phone = _str(df["BRANCH_PHONE"])
+    df["BRANCH_CODE"] = _int(df["BRANCH_CODE"])
+    for column in ("BRANCH_NAME", "BRANCH_STREET", "BRANCH_CITY", "BRANCH_STATE"):
+        df[column] = _str(df[column])
+    df["BRANCH_ZIP"] = _lpad(zip_code, 5, "0").fillna("999999")
+    df["BRANCH_PHONE"] = _format_phone(_substring(phone, 1, 3), _substring(phone, 4, 3), _substring(phone, 7, 4))
+    df["LAST_UPDATED"] = _timestamp(df["LAST_UPDATED"])
+    return df
+
+
+def transform_credit(creditcard_df):
+    """
+    Apply the credit card mapping document: pad DAY/MONTH and build TIMEID as YYYYMMDD,
+    plus the TRANSACTION_DATE and TRANSACTION_YYYYMM keys (see credit_card_etl.transform_credit).
+    """
+    df = creditcard_df.copy()
+    df["DAY"] = _lpad(_str(df["DAY"]), 2, "0")
+    df["MONTH"] = _lpad(_str(df["MONTH"]), 2, "0")
+    df["CUST_CC_NO"] = _str(df["CREDIT_CARD_NO"])
+    df["TIMEID"] = _str(df["YEAR"]) + df["MONTH"] + df["DAY"]
+    df["CUST_SSN"] = _int(df["CUST_SSN"])
+    df["BRANCH_CODE"] = _int(df["BRANCH_CODE"])
+    df["TRANSACTION_TYPE"] = _str(df["TRANSACTION_TYPE"])
+    df["TRANSACTION_VALUE"] = pd.to_numeric(df["TRANSACTION_VALUE"], errors="coerce").astype("float64")
+    df["TRANSACTION_ID"] = _int(df["TRANSACTION_ID"])
+    df["TRANSACTION_DATE"] = pd.to_datetime(df["TIMEID"], format="%Y%m%d", errors="coerce").dt.date
+    df["TRANSACTION_YYYYMM"] = (_int(df["YEAR"]) * 100 + _int(df["MONTH"])).astype("Int32")
+    return df
+
+
+def transform_customer(customer_df):
+    """
+    Apply the customer mapping document: initcap/lower the names, build FULL_STREET_ADDRESS and format CUST_PHONE.
+    """
+    df = customer_df.copy()
+    phone = _str(df["CUST_PHONE"])
+    df["SSN"] = _int(df["SSN"])
+    df["FIRST_NAME"] = _initcap(_str(df["FIRST_NAME"]))
+    df["MIDDLE_NAME"] = _str(df["MIDDLE_NAME"]).str.lower()
+    df["LAST_NAME"] = _initcap(_str(df["LAST_NAME"]))
+    df["CREDIT_CARD_NO"] = _str(df["CREDIT_CARD_NO"])
+    df["FULL_STREET_ADDRESS"] = _str(df["STREET_NAME"]) + ", " + _str(df["APT_NO"])
+    for column in ("CUST_CITY", "CUST_STATE", "CUST_COUNTRY", "CUST_ZIP", "CUST_EMAIL"):
+        df[column] = _str(df[column])
+    df["CUST_PHONE"] = _format_phone(_substring(phone, 1, 3), _substring(phone, 4, 3), _substring(phone, 4, 4))
+    df["LAST_UPDATED"] = _timestamp(df["LAST_UPDATED"])
+    return df
+
+
+TRANSFORMS = {
+    "branch": transform_branch,
+    "credit": transform_credit,
+    "customer": transform_customer,
+}
+
+
+def extract(sources=SOURCES):
+    """
+    Read every source file once into a pandas DataFrame.
+
+    Args:
+        sources (dict): name -> (path, columns) of the files to read.
+
+    Returns:
+        dict: name -> raw DataFrame.
+    """
+    frames = {}
+    for name, (path, columns) in sources.items():
+        frames[name] = read_json_records(path, columns=columns)
+        logging.info(f"Extracted {name} from {path}: {len(frames[name])} rows")
+    return frames
+
+
+def transform(frames, keep_source=False):
+    """
+    Run the mapping-document transform of every extracted source.
+
+    Args:
+        frames (dict): name -> DataFrame as returned by extract().
+        keep_source (bool): Keep the raw values the data-quality source rules
+            check (DQ_SOURCE_<column>), for validate().
+
+    Returns:
+        dict: name -> transformed DataFrame.
+    """
+    if keep_source:
+        frames = {name: keep_source_pandas(df, name) for name, df in frames.items()}
+    return {name: TRANSFORMS[name](df) for name, df in frames.items()}
+
+
+def validate(frames):
+    """
+    Check the transformed DataFrames against data_quality.RULES (see credit_card_etl.validate).
+
+    Args:
+        frames (dict): name -> DataFrame as returned by transform(..., keep_source=True).
+
+    Returns:
+        tuple: (name -> rows to load, name -> rejected rows, name -> rule counts).
+    """
+    clean, quarantined, counts = {}, {}, {}
+    for name, df in frames.items():
+        clean[name], quarantined[name], counts[name] = validate_pandas(df, name)
+    return clean, quarantined, counts
+
+
+def load(frames, engine_url, chunksize=10000):
+    """
+    Write the transformed DataFrames to their CDW_SAPP tables with pandas.to_sql.
+
+    An existing table is emptied and appended to, so it keeps the keys and
+    indexes schema_bootstrap.py gave it; a missing one is created.
+
+    Args:
+        frames (dict): name -> transformed DataFrame.
+        engine_url (str): SQLAlchemy URL, e.g. mysql+pymysql://user:pw@host:3306/creditcard_capstone
+            or sqlite:///your_database.db.
+        chunksize (int): Rows per multi-row INSERT.
+    """
+    from sqlalchemy import create_engine, inspect, text
+
+    table_names = {"branch": "CDW_SAPP_BRANCH", "credit": "CDW_SAPP_CREDIT_CARD", "customer": "CDW_SAPP_CUSTOMER"}
+    engine = create_engine(engine_url)
+    # SQLite has no TRUNCATE
+    empty = "TRUNCATE TABLE" if engine.dialect.name == "mysql" else "DELETE FROM"
+    try:
+        for name, df in frames.items():
+            start = time.perf_counter()
+            with engine.begin() as connection:
+                if inspect(connection).has_table(table_names[name]):
+                    connection.execute(text(f"{empty} {table_names[name]}"))
+                df.to_sql(table_names[name], connection, if_exists="append", index=False,
+                          chunksize=chunksize, method="multi")
+            logging.info(f"Loaded {len(df)} rows into {table_names[name]} in {time.perf_counter() - start:.2f} s")
+    finally:
+        engine.dispose()
+    invalidate()
+
+
+def _normalize(s):
+    # Render both engines' values the same way: integer text, no trailing .0, "<NA>" for nulls
+    if pd.api.types.is_float_dtype(s):
+        return s.map(repr).where(s.notna(), "<NA>")
+    if pd.api.types.is_datetime64_any_dtype(s):
+        return s.dt.strftime("%Y-%m-%d %H:%M:%S").fillna("<NA>")
+    return _str(s).fillna("<NA>")
+
+
+def compare(spark_frames, pandas_frames):
+    """
+    Compare the Spark and pandas transforms column by column.
+
+    Args:
+        spark_frames (dict): name -> transformed Spark DataFrame.
+        pandas_frames (dict): name -> transformed pandas DataFrame.
+
+    Returns:
+        dict: name -> {column: number of mismatching rows}; only mismatches are listed.
+            A column present in one engine only is reported with the row count.
+    """
+    mismatches = {}
+    for name, pdf in pandas_frames.items():
+        sdf = spark_frames[name].toPandas()
+        key = KEYS[name]
+        sdf = sdf.sort_values(key).reset_index(drop=True)
+        pdf = pdf.sort_values(key).reset_index(drop=True)
+        diff = {}
+        if len(sdf) != len(pdf):
+            diff["<row count>"] = abs(len(sdf) - len(pdf))
+        for column in sorted(set(sdf.columns) | set(pdf.columns)):
+            if column not in sdf.columns or column not in pdf.columns:
+                diff[column] = max(len(sdf), len(pdf))
+                continue
+            if len(sdf) == len(pdf):
+                bad = int((_normalize(sdf[column]) != _normalize(pdf[column])).sum())
+                if bad:
+                    diff[column] = bad
+        if list(sdf.columns) != list(pdf.columns) and not diff:
+            diff["<column order>"] = 1
+        if diff:
+            mismatches[name] = diff
+    return mismatches
+
+
+def _run_pandas(sources):
+    return transform(extract(sources))
+
+
+def _run_spark(sources):
+    from credit_card_etl import SOURCES as SPARK_SOURCES, extract as spark_extract, \
+        get_spark_session, transform as spark_transform
+
+    spark = get_spark_session()
+    spark.conf.set("spark.sql.session.timeZone", SESSION_TIMEZONE)
+    frames = spark_transform(spark_extract(spark, {name: SPARK_SOURCES[name] for name in sources}))
+    for df in frames.values():
+        df.write.format("noop").mode("overwrite").save()  # force the full transform
+    return frames
+
+
+def benchmark(sources=SOURCES):
+    """
+    Time both engines from a cold start: the Spark timing includes creating the SparkSession (JVM start).
+
+    Returns:
+        dict: engine -> wall-clock seconds.
+    """
+    timings = {}
+    start = time.perf_counter()
+    pandas_frames = _run_pandas(sources)
+    timings["pandas"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    spark_frames = _run_spark(sources)
+    timings["spark (incl. session startup)"] = time.perf_counter() - start
+
+    print("\nEngine timing report")
+    for engine, seconds in timings.items():
+        print(f"{engine:<32} {seconds:8.3f} s")
+    mismatches = compare(spark_frames, pandas_frames)
+    print("Outputs match column by column" if not mismatches else f"Output mismatches: {mismatches}")
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="pandas engine for the credit card ETL")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="time the pandas and Spark engines and check their outputs match")
+    args = parser.parse_args()
+
+    sources = {name: spec for name, spec in SOURCES.items() if os.path.exists(spec[0])}
+    if args.benchmark:
+        benchmark(sources)
+        return
+    for name, df in _run_pandas(sources).items():
+        print(f"{name}_df_transformed")
+        print(df.dtypes)
+        print(df.head(5))
+
+
+if __name__ == "__main__":
+    main()
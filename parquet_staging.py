@@ -0,0 +1,140 @@
+# Columnar Parquet staging between the transform and load stages.
+#
+# The transformed tables are written to staging/parquet/<TABLE>/ (transactions
+# partitioned by YEAR and MONTH), so a failed load can be retried from the staged
+# files without re-extracting, and the visualization and loan reports can read
+# the columns they need straight from the files, skipping partitions they filter out.
+
+import os
+import shutil
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+STAGING_DIR = os.path.join("staging", "parquet")
+
+# table -> Hive-style partition columns and their types
+PARTITIONS = {
+    "CDW_SAPP_CREDIT_CARD": [("YEAR", pa.int64()), ("MONTH", pa.string())],
+}
+
+
+def table_path(table, staging_dir=STAGING_DIR):
+    return os.path.join(staging_dir, table)
+
+
+def is_staged(table, staging_dir=STAGING_DIR):
+    """
+    Return True if table has been staged.
+    """
+    return os.path.isdir(table_path(table, staging_dir))
+
+
+def _partitioning(table):
+    columns = PARTITIONS.get(table)
+    if not columns:
+        return None
+    # Explicit types: MONTH=02 must stay the string "02", not become the integer 2
+    return ds.partitioning(pa.schema(columns), flavor="hive")
+
+
+def stage_spark(frames, staging_dir=STAGING_DIR):
+    """
+    Write transformed Spark DataFrames to Parquet.
+
+    Args:
+        frames (dict): table name -> transformed Spark DataFrame.
+        staging_dir (str): Root directory of the staged tables.
+
+    Returns:
+        dict: table name -> staged path.
+    """
+    paths = {}
+    for table, df in frames.items():
+        path = table_path(table, staging_dir)
+        writer = df.write.mode("overwrite")
+        if table in PARTITIONS:
+            writer = writer.partitionBy(*[c for c, _ in PARTITIONS[table]])
+        writer.parquet(path)
+        paths[table] = path
+    return paths
+
+
+def read_spark(spark, tables, staging_dir=STAGING_DIR):
+    """
+    Read staged tables back as Spark DataFrames, e.g. to retry a failed load.
+
+    Args:
+        spark (SparkSession): The shared session.
+        tables (list): Table names to read.
+        staging_dir (str): Root directory of the staged tables.
+
+    Returns:
+        dict: table name -> DataFrame.
+    """
+    frames = {}
+    inference = spark.conf.get("spark.sql.sources.partitionColumnTypeInference.enabled", "true")
+    # Without this, MONTH=02 would come back as the integer 2
+    spark.conf.set("spark.sql.sources.partitionColumnTypeInference.enabled", "false")
+    try:
+        for table in tables:
+            df = spark.read.parquet(table_path(table, staging_dir))
+            for column, arrow_type in PARTITIONS.get(table, []):
+                if pa.types.is_integer(arrow_type):
+                    df = df.withColumn(column, df[column].cast("bigint"))
+            frames[table] = df
+    finally:
+        spark.conf.set("spark.sql.sources.partitionColumnTypeInference.enabled", inference)
+    return frames
+
+
+def stage_pandas(frames, staging_dir=STAGING_DIR):
+    """
+    Write transformed pandas DataFrames to Parquet with the same layout as stage_spark().
+
+    Args:
+        frames (dict): table name -> transformed pandas DataFrame.
+        staging_dir (str): Root directory of the staged tables.
+
+    Returns:
+        dict: table name -> staged path.
+    """
+    paths = {}
+    for table, df in frames.items():
+        path = table_path(table, staging_dir)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        arrow_table = pa.Table.from_pandas(df, preserve_index=False)
+        if table in PARTITIONS:
+            pq.write_to_dataset(arrow_table, path, partition_cols=[c for c, _ in PARTITIONS[table]])
+        else:
+            os.makedirs(path)
+            pq.write_table(arrow_table, os.path.join(path, "part-00000.parquet"))
+        paths[table] = path
+    return paths
+
+
+def read_table(table, columns=None, filters=None, staging_dir=STAGING_DIR):
+    """
+    Read a staged table into pandas, reading only the requested columns and partitions.
+
+    Args:
+        table (str): Table name, e.g. "CDW_SAPP_CREDIT_CARD".
+        columns (list): Columns to read; None reads all of them.
+        filters (list): pyarrow filters, e.g. [("YEAR", "=", 2018), ("MONTH", "=", "02")].
+            Filters on partition columns skip whole directories.
+        staging_dir (str): Root directory of the staged tables.
+
+    Returns:
+        DataFrame: The selected rows and columns.
+    """
+    return pq.read_table(table_path(table, staging_dir), columns=columns, filters=filters,
+                         partitioning=_partitioning(table) or "hive").to_pandas()
+
+
+def dataset(table, staging_dir=STAGING_DIR):
+    """
+    Return a pyarrow dataset over a staged table, for scanners that push down their own projections.
+    """
+    return ds.dataset(table_path(table, staging_dir), format="parquet", partitioning=_partitioning(table))
@@ -0,0 +1,236 @@
+# Pluggable query backends for the section 3 and 5 reports.
+#
+# Every report is one aggregate query, written once in REPORT_QUERIES. The
+# "mysql" backend runs it against the OLTP database as before; the "duckdb"
+# backend runs the same SQL in process over the Parquet files staged by
+# parquet_staging.py, so the charts render without touching production.
+# Choose with REPORT_BACKEND=mysql|duckdb (default: duckdb when staged data exists).
+
+import argparse
+import os
+import statistics
+import time
+
+import pandas as pd
+
+from db_config import connect
+from parquet_staging import STAGING_DIR, is_staged, table_path
+from report_cache import ReportCache
+
+REPORT_QUERIES = {
+    # 3.1 Transaction Type with Highest Transaction Count
+    "transaction_type_count": """
+        SELECT TRANSACTION_TYPE, COUNT(*) AS count
+        FROM CDW_SAPP_CREDIT_CARD
+        GROUP BY TRANSACTION_TYPE""",
+    # 3.2 Top 10 States with Highest Number of Customers
+    "top_states_by_customers": """
+        SELECT CUST_STATE, COUNT(*) AS count
+        FROM CDW_SAPP_CUSTOMER
+        GROUP BY CUST_STATE
+        ORDER BY count DESC
+        LIMIT 10""",
+    # 3.3 Top 10 Customers with Highest Transaction Amounts
+    "top_customers_by_transaction_amount": """
+        SELECT CUST_SSN, SUM(TRANSACTION_VALUE) AS total_amount
+        FROM CDW_SAPP_CREDIT_CARD
+        GROUP BY CUST_SSN
+        ORDER BY total_amount DESC
+        LIMIT 10""",
+    # 5.3 Top three months with the largest volume of transactions.
+    # Grouped on the indexed integer TRANSACTION_YYYYMM (an index-only scan); only the
+    # three result rows are split into year and month text.
+    "top_three_months": """
+        SELECT
+            SUBSTRING(CAST(TRANSACTION_YYYYMM AS CHAR(6)), 1, 4) AS Transaction_Year,
+            SUBSTRING(CAST(TRANSACTION_YYYYMM AS CHAR(6)), 5, 2) AS Transaction_Month,
+            Number_of_Transactions
+        FROM (
+            SELECT TRANSACTION_YYYYMM, COUNT(*) AS Number_of_Transactions
+            FROM CDW_SAPP_CREDIT_CARD
+            GROUP BY TRANSACTION_YYYYMM
+            ORDER BY Number_of_Transactions DESC
+            LIMIT 3
+        ) months
+        ORDER BY Number_of_Transactions DESC""",
+    # 5.4 Branch with the highest total dollar value of healthcare transactions
+    "healthcare_by_branch": """
+        SELECT BRANCH_CODE, SUM(TRANSACTION_VALUE) AS Total_Healthcare_Transaction_Value
+        FROM CDW_SAPP_CREDIT_CARD
+        WHERE TRANSACTION_TYPE = 'Healthcare'
+        GROUP BY BRANCH_CODE
+        ORDER BY Total_Healthcare_Transaction_Value DESC
+        LIMIT 10""",
+}
+
+# Tables the duckdb backend exposes as views over the staged Parquet files
+STAGED_TABLES = ["CDW_SAPP_BRANCH", "CDW_SAPP_CREDIT_CARD", "CDW_SAPP_CUSTOMER", "CDW_SAPP_loan_application"]
+
+
+class MySQLBackend:
+    """
+    Runs report queries on the MySQL database.
+    """
+
+    name = "mysql"
+
+    def __init__(self):
+        self._conn = connect()
+
+    def query(self, sql, params=None):
+        cursor = self._conn.cursor()
+        try:
+            cursor.execute(sql, params or ())
+            columns = [d[0] for d in cursor.description]
+            return pd.DataFrame(cursor.fetchall(), columns=columns)
+        finally:
+            cursor.close()
+
+    def scan(self, sql, params=None, chunk_size=100000):
+        """
+        Yield the rows of sql as DataFrames of at most chunk_size rows, streamed from the server.
+        """
+        # Unbuffered: rows are read from the server as fetchmany() asks for them
+        cursor = self._conn.cursor(buffered=False)
+        try:
+            cursor.execute(sql, params or ())
+            columns = [d[0] for d in cursor.description]
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield pd.DataFrame(rows, columns=columns)
+        finally:
+            cursor.close()
+
+    def close(self):
+        self._conn.close()
+
+
+class DuckDBBackend:
+    """
+    Runs report queries in process with DuckDB over the staged Parquet files.
+    """
+
+    name = "duckdb"
+
+    def __init__(self, staging_dir=STAGING_DIR):
+        import duckdb
+
+        self._conn = duckdb.connect()
+        for table in STAGED_TABLES:
+            if not is_staged(table, staging_dir):
+                continue
+            files = os.path.join(table_path(table, staging_dir), "**", "*.parquet")
+            # hive_types keeps MONTH=02 a string, as in the source table
+            self._conn.execute(
+                f"CREATE VIEW {table} AS SELECT * FROM read_parquet('{files}', "
+                f"hive_partitioning = true, hive_types = {{'YEAR': BIGINT, 'MONTH': VARCHAR}}, union_by_name = true)"
+                if table == "CDW_SAPP_CREDIT_CARD" else
+                f"CREATE VIEW {table} AS SELECT * FROM read_parquet('{files}')")
+
+    def query(self, sql, params=None):
+        # DB-API style %s placeholders become DuckDB's ?
+        return self._conn.execute(sql.replace("%s", "?"), list(params or ())).df()
+
+    def scan(self, sql, params=None, chunk_size=100000):
+        """
+        Yield the rows of sql as DataFrames of at most chunk_size rows.
+        """
+        result = self._conn.execute(sql.replace("%s", "?"), list(params or ()))
+        while True:
+            chunk = result.fetch_df_chunk(max(1, chunk_size // 2048))
+            if chunk.empty:
+                break
+            yield chunk
+
+    def close(self):
+        self._conn.close()
+
+
+BACKENDS = {
+    "mysql": MySQLBackend,
+    "duckdb": DuckDBBackend,
+}
+
+
+def default_backend_name():
+    name = os.getenv("REPORT_BACKEND")
+    if name:
+        return name
+    return "duckdb" if is_staged("CDW_SAPP_CREDIT_CARD") else "mysql"
+
+
+_backends = {}
+
+
+def get_backend(name=None):
+    """
+    Return the (cached) backend instance for name, or for REPORT_BACKEND by default.
+    """
+    name = name or default_backend_name()
+    if name not in _backends:
+        _backends[name] = BACKENDS[name]()
+    return _backends[name]
+
+
+# Shared by every run_report() call; emptied by report_cache.invalidate() after each load
+cache = ReportCache()
+
+
+def run_report(report, backend=None, params=None, use_cache=True):
+    """
+    Run one of REPORT_QUERIES and return its result as a pandas DataFrame.
+
+    Args:
+        report (str): Key of REPORT_QUERIES.
+        backend (str): Backend name; REPORT_BACKEND / default_backend_name() when None.
+        params (tuple): Query parameters, if the report takes any.
+        use_cache (bool): Serve the result from the report cache when it is still valid.
+
+    Returns:
+        DataFrame: The aggregate rows.
+    """
+    name = backend or default_backend_name()
+    if not use_cache:
+        return get_backend(name).query(REPORT_QUERIES[report], params)
+    result = cache.get_or_compute((name, report, tuple(params or ())),
+                                  lambda: get_backend(name).query(REPORT_QUERIES[report], params))
+    # A copy, so a caller sorting or adding columns cannot change the cached frame
+    return result.copy()
+
+
+def benchmark(backends=("mysql", "duckdb"), runs=5):
+    """
+    Time every report on each backend and print the median latency in milliseconds.
+
+    Returns:
+        dict: (backend, report) -> median seconds.
+    """
+    timings = {}
+    for name in backends:
+        backend = get_backend(name)
+        for report in REPORT_QUERIES:
+            samples = []
+            for _ in range(runs):
+                start = time.perf_counter()
+                backend.query(REPORT_QUERIES[report])
+                samples.append(time.perf_counter() - start)
+            timings[(name, report)] = statistics.median(samples)
+
+    print(f"\n{'report':<40}" + "".join(f"{name + ' (ms)':>16}" for name in backends))
+    for report in REPORT_QUERIES:
+        print(f"{report:<40}" + "".join(f"{timings[(name, report)] * 1000:>16.2f}" for name in backends))
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the report query backends")
+    parser.add_argument("--backends", nargs="+", choices=sorted(BACKENDS), default=["mysql", "duckdb"])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    benchmark(tuple(args.backends), args.runs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+# Memoized report results for the section 3 and 5 charts.
+#
+# The report aggregates only change when the ETL loads new data (once a day),
+# but the charts are refreshed constantly. Results are cached per
+# (backend, report, params) with a TTL and LRU eviction, optionally mirrored
+# to disk so other processes reuse them. Every entry is stamped with the data
+# generation, a counter kept in watermarks.json that invalidate() bumps after
+# each successful load; an entry from an older generation is never served.
+
+import hashlib
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from watermark_store import WATERMARK_FILE, read_watermarks, update_watermarks
+
+GENERATION_KEY = "REPORT_GENERATION"
+
+TTL_SECONDS = 15 * 60
+MAX_ENTRIES = 128
+# Set REPORT_CACHE_DIR to share the cache between processes through pickle files
+CACHE_DIR = os.getenv("REPORT_CACHE_DIR")
+
+
+def current_generation(watermark_file=WATERMARK_FILE):
+    """
+    Return the data generation: the number of loads since the cache was introduced.
+    """
+    return read_watermarks(watermark_file).get(GENERATION_KEY, 0)
+
+
+def invalidate(watermark_file=WATERMARK_FILE):
+    """
+    Start a new data generation, so every cached report is recomputed. Called after each successful load.
+
+    Returns:
+        int: The new generation.
+    """
+    with update_watermarks(watermark_file) as watermarks:
+        watermarks[GENERATION_KEY] = watermarks.get(GENERATION_KEY, 0) + 1
+    return watermarks[GENERATION_KEY]
+
+
+class ReportCache:
+    """
+    TTL + LRU cache of report results, with an optional on-disk store.
+
+    Args:
+        ttl (float): Seconds an entry stays valid.
+        max_entries (int): In-memory entries kept before the least recently used is evicted.
+        cache_dir (str): Directory of the on-disk store; None keeps the cache in memory only.
+        watermark_file (str): File holding the data generation.
+    """
+
+    def __init__(self, ttl=TTL_SECONDS, max_entries=MAX_ENTRIES, cache_dir=CACHE_DIR,
+                 watermark_file=WATERMARK_FILE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.watermark_file = watermark_file
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (generation, expires, value)
+        self._lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _disk_path(self, key):
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.pkl")
+
+    def _valid(self, entry, generation):
+        return entry is not None and entry[0] == generation and entry[1] > time.time()
+
+    def _read_disk(self, key):
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._disk_path(key), "rb") as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+    def _write_disk(self, key, entry):
+        path = self._disk_path(key)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    def get(self, key):
+        """
+        Return the cached value for key, or None if it is missing, expired or from an older generation.
+        """
+        generation = current_generation(self.watermark_file)
+        with self._lock:
+            entry = self._entries.get(key)
+            if self._valid(entry, generation):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            self._entries.pop(key, None)
+
+        entry = self._read_disk(key)
+        with self._lock:
+            if self._valid(entry, generation):
+                self._store(key, entry)
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+        return None
+
+    def _store(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def put(self, key, value, generation=None):
+        """
+        Cache value for key.
+
+        Args:
+            generation (int): Data generation value was computed from, read before
+                computing it; the current one by default.
+        """
+        if generation is None:
+            generation = current_generation(self.watermark_file)
+        entry = (generation, time.time() + self.ttl, value)
+        with self._lock:
+            self._store(key, entry)
+        if self.cache_dir:
+            self._write_disk(key, entry)
+
+    def get_or_compute(self, key, compute):
+        """
+        Return the cached value for key, calling compute() and caching its result on a miss.
+        """
+        value = self.get(key)
+        if value is None:
+            # Read first: a load finishing during compute() must not have its
+            # generation stamped on a result computed from the older data
+            generation = current_generation(self.watermark_file)
+            value = compute()
+            self.put(key, value, generation)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.cache_dir:
+            for name in os.listdir(self.cache_dir):
+                if name.endswith(".pkl"):
+                    os.remove(os.path.join(self.cache_dir, name))
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
@@ -0,0 +1,130 @@
+# All CDW_SAPP_CREDIT_CARD report aggregates from a single scan.
+#
+# Sections 3.1, 3.3, 5.3 and 5.4 each used to scan the transaction table:
+# count by TRANSACTION_TYPE, sum by CUST_SSN, count by year-month and the
+# healthcare sum by BRANCH_CODE. compute_fact_reports() produces the same four
+# results (same columns as report_backend.REPORT_QUERIES) from one pass:
+#   - duckdb: one GROUPING SETS query over the staged Parquet files;
+#   - mysql:  MySQL has no GROUPING SETS, so the needed columns are streamed
+#             once from an unbuffered cursor and aggregated chunk by chunk.
+
+import pandas as pd
+
+from report_backend import cache, default_backend_name, get_backend
+
+FACT_REPORTS = ["transaction_type_count", "top_customers_by_transaction_amount",
+                "top_three_months", "healthcare_by_branch"]
+
+CHUNK_SIZE = 100000
+
+HEALTHCARE = "Healthcare"
+
+# One row per grouping set; GROUPING_ID tells the sets apart
+GROUPING_SETS_QUERY = f"""
+SELECT
+    GROUPING(TRANSACTION_TYPE, CUST_SSN, YEAR, MONTH, BRANCH_CODE) AS GROUPING_ID,
+    TRANSACTION_TYPE, CUST_SSN, YEAR, MONTH, BRANCH_CODE,
+    COUNT(*) AS TRANSACTION_COUNT,
+    SUM(TRANSACTION_VALUE) AS TOTAL_VALUE,
+    SUM(TRANSACTION_VALUE) FILTER (WHERE TRANSACTION_TYPE = '{HEALTHCARE}') AS HEALTHCARE_VALUE
+FROM CDW_SAPP_CREDIT_CARD
+GROUP BY GROUPING SETS ((TRANSACTION_TYPE), (CUST_SSN), (YEAR, MONTH), (BRANCH_CODE))
+"""
+
+# GROUPING() bits, most significant first: TRANSACTION_TYPE, CUST_SSN, YEAR, MONTH, BRANCH_CODE
+BY_TYPE, BY_SSN, BY_MONTH, BY_BRANCH = 0b01111, 0b10111, 0b11001, 0b11110
+
+SCAN_QUERY = """
+SELECT TRANSACTION_TYPE, CUST_SSN, YEAR, MONTH, BRANCH_CODE, TRANSACTION_VALUE
+FROM CDW_SAPP_CREDIT_CARD
+"""
+
+
+def _format(by_type, by_ssn, by_month, by_branch):
+    # Shape the four aggregates like the corresponding REPORT_QUERIES results
+    top_ssn = by_ssn.nlargest(10)
+    top_months = by_month.nlargest(3)
+    top_branches = by_branch.dropna().nlargest(10)
+    return {
+        "transaction_type_count": pd.DataFrame({"TRANSACTION_TYPE": by_type.index, "count": by_type.values}),
+        "top_customers_by_transaction_amount": pd.DataFrame(
+            {"CUST_SSN": top_ssn.index, "total_amount": top_ssn.values}),
+        "top_three_months": pd.DataFrame({
+            "Transaction_Year": [str(year) for year, _ in top_months.index],
+            "Transaction_Month": [str(month) for _, month in top_months.index],
+            "Number_of_Transactions": top_months.values,
+        }),
+        "healthcare_by_branch": pd.DataFrame(
+            {"BRANCH_CODE": top_branches.index, "Total_Healthcare_Transaction_Value": top_branches.values}),
+    }
+
+
+def _from_grouping_sets(rows):
+    def pick(grouping_id, keys, value):
+        subset = rows[rows["GROUPING_ID"] == grouping_id]
+        return subset.set_index(keys)[value]
+
+    return _format(
+        pick(BY_TYPE, "TRANSACTION_TYPE", "TRANSACTION_COUNT"),
+        pick(BY_SSN, "CUST_SSN", "TOTAL_VALUE"),
+        pick(BY_MONTH, ["YEAR", "MONTH"], "TRANSACTION_COUNT"),
+        pick(BY_BRANCH, "BRANCH_CODE", "HEALTHCARE_VALUE"),
+    )
+
+
+def aggregate_chunks(chunks):
+    """
+    Fold DataFrame chunks of SCAN_QUERY rows into the four fact reports.
+
+    Each chunk is reduced to partial aggregates straight away, so memory is
+    bounded by the number of groups, not the number of rows.
+
+    Args:
+        chunks (iterable): DataFrames with the SCAN_QUERY columns.
+
+    Returns:
+        dict: report name -> DataFrame.
+    """
+    by_type = by_ssn = by_month = by_branch = None
+
+    def add(total, part):
+        return part if total is None else total.add(part, fill_value=0)
+
+    for chunk in chunks:
+        by_type = add(by_type, chunk.groupby("TRANSACTION_TYPE").size())
+        by_ssn = add(by_ssn, chunk.groupby("CUST_SSN")["TRANSACTION_VALUE"].sum())
+        by_month = add(by_month, chunk.groupby(["YEAR", "MONTH"]).size())
+        healthcare = chunk[chunk["TRANSACTION_TYPE"] == HEALTHCARE]
+        by_branch = add(by_branch, healthcare.groupby("BRANCH_CODE")["TRANSACTION_VALUE"].sum())
+
+    if by_type is None:
+        empty = pd.Series(dtype="float64")
+        by_type = by_ssn = by_branch = empty
+        by_month = pd.Series(dtype="float64", index=pd.MultiIndex.from_tuples([], names=["YEAR", "MONTH"]))
+    # add() turns counts into floats once a key is missing from a chunk
+    return _format(by_type.astype("int64"), by_ssn, by_month.astype("int64"), by_branch)
+
+
+def _compute(backend):
+    if backend.name == "duckdb":
+        return _from_grouping_sets(backend.query(GROUPING_SETS_QUERY))
+    return aggregate_chunks(backend.scan(SCAN_QUERY, chunk_size=CHUNK_SIZE))
+
+
+def compute_fact_reports(backend=None, use_cache=True):
+    """
+    Compute every CDW_SAPP_CREDIT_CARD report in one scan of the table.
+
+    Args:
+        backend (str): Backend name; REPORT_BACKEND / default_backend_name() when None.
+        use_cache (bool): Serve the results from the report cache when still valid.
+
+    Returns:
+        dict: report name (see FACT_REPORTS) -> DataFrame, as run_report() would return it.
+    """
+    name = backend or default_backend_name()
+    if use_cache:
+        reports = cache.get_or_compute((name, "fact_reports", ()), lambda: _compute(get_backend(name)))
+    else:
+        reports = _compute(get_backend(name))
+    return {report: df.copy() for report, df in reports.items()}
@@ -0,0 +1,303 @@
+# Schema bootstrap for the CDW_SAPP tables, run after every load.
+#
+# The Spark JDBC writes create tables with TEXT/BIGINT columns and no keys or
+# indexes, so every menu lookup is a full table scan. bootstrap() gives the
+# columns real types, adds the primary keys, and creates the composite indexes
+# the menu and report queries filter on. It only changes what is missing, so it
+# is cheap to run after each load. check_indexes() EXPLAINs every menu query and
+# reports any that still scan a whole table.
+
+import argparse
+import logging
+import re
+
+from data_access import QUERIES, month_bounds
+from db_config import DB_NAME, connect
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# table -> column types, primary key and secondary indexes (name -> columns)
+TABLES = {
+    "CDW_SAPP_BRANCH": {
+        "columns": {
+            "BRANCH_CODE": "INT NOT NULL",
+            "BRANCH_NAME": "VARCHAR(64)",
+            "BRANCH_STREET": "VARCHAR(64)",
+            "BRANCH_CITY": "VARCHAR(64)",
+            "BRANCH_STATE": "VARCHAR(64)",
+            "BRANCH_ZIP": "VARCHAR(8)",
+            "BRANCH_PHONE": "VARCHAR(16)",
+            "LAST_UPDATED": "DATETIME",
+        },
+        "primary_key": ["BRANCH_CODE"],
+        "indexes": {},
+    },
+    "CDW_SAPP_CUSTOMER": {
+        "columns": {
+            "SSN": "INT NOT NULL",
+            "FIRST_NAME": "VARCHAR(64)",
+            "MIDDLE_NAME": "VARCHAR(64)",
+            "LAST_NAME": "VARCHAR(64)",
+            "CREDIT_CARD_NO": "VARCHAR(16)",
+            "APT_NO": "VARCHAR(16)",
+            "STREET_NAME": "VARCHAR(64)",
+            "FULL_STREET_ADDRESS": "VARCHAR(128)",
+            "CUST_CITY": "VARCHAR(64)",
+            "CUST_STATE": "VARCHAR(64)",
+            "CUST_COUNTRY": "VARCHAR(64)",
+            "CUST_ZIP": "VARCHAR(8)",
+            "CUST_PHONE": "VARCHAR(16)",
+            "CUST_EMAIL": "VARCHAR(64)",
+            "LAST_UPDATED": "DATETIME",
+        },
+        "primary_key": ["SSN"],
+        "indexes": {
+            # 2.1: customers in a ZIP code joined to their transactions
+            "IDX_CUSTOMER_ZIP_SSN": ["CUST_ZIP", "SSN"],
+            # 3.2: customers per state
+            "IDX_CUSTOMER_STATE": ["CUST_STATE"],
+        },
+    },
+    "CDW_SAPP_CREDIT_CARD": {
+        "columns": {
+            "TRANSACTION_ID": "INT NOT NULL",
+            "CREDIT_CARD_NO": "VARCHAR(16)",
+            "CUST_CC_NO": "VARCHAR(16)",
+            "DAY": "CHAR(2)",
+            "MONTH": "CHAR(2)",
+            "YEAR": "INT",
+            "TIMEID": "CHAR(8)",
+            "CUST_SSN": "INT",
+            "BRANCH_CODE": "INT",
+            "TRANSACTION_TYPE": "VARCHAR(32)",
+            "TRANSACTION_VALUE": "DOUBLE",
+            "TRANSACTION_DATE": "DATE",
+            "TRANSACTION_YYYYMM": "INT",
+        },
+        "primary_key": ["TRANSACTION_ID"],
+        "indexes": {
+            # 2.2 monthly bill
+            "IDX_CC_CARD_YEAR_MONTH": ["CREDIT_CARD_NO", "YEAR", "MONTH"],
+            # 2.1 and 2.2 transactions of a customer in a date range, newest first
+            # (InnoDB appends TRANSACTION_ID, the keyset pagination tie-breaker)
+            "IDX_CC_SSN_DATE": ["CUST_SSN", "TRANSACTION_DATE"],
+            # 5.3 transactions per month (index-only GROUP BY)
+            "IDX_CC_YYYYMM": ["TRANSACTION_YYYYMM"],
+            # 3.1 / 5.4 per-type and per-branch aggregates (covers the healthcare sum)
+            "IDX_CC_TYPE_BRANCH": ["TRANSACTION_TYPE", "BRANCH_CODE", "TRANSACTION_VALUE"],
+            # batch bills of every card in a month (batch_billing.py --source transactions)
+            "IDX_CC_YEAR_MONTH_CARD": ["YEAR", "MONTH", "CREDIT_CARD_NO"],
+        },
+        # Superseded by IDX_CC_SSN_DATE
+        "retired_indexes": ["IDX_CC_SSN_TIMEID"],
+        # Rows loaded before the date keys existed: an incremental load only
+        # writes rows above the TIMEID watermark, so fill the older ones here
+        "backfill": {
+            ("TRANSACTION_DATE", "TRANSACTION_YYYYMM"):
+                "UPDATE CDW_SAPP_CREDIT_CARD SET TRANSACTION_DATE = STR_TO_DATE(TIMEID, '%Y%m%d'), "
+                "TRANSACTION_YYYYMM = YEAR * 100 + MONTH "
+                "WHERE TRANSACTION_DATE IS NULL OR TRANSACTION_YYYYMM IS NULL",
+        },
+    },
+    "CDW_SAPP_CARD_MONTHLY_SUMMARY": {
+        # Created by monthly_summary.py; listed so older copies get the month index
+        "columns": {},
+        "primary_key": ["CREDIT_CARD_NO", "YEAR", "MONTH", "TRANSACTION_TYPE"],
+        "indexes": {
+            # batch bills of every card in a month (batch_billing.py)
+            "IDX_SUMMARY_MONTH": ["YEAR", "MONTH", "TRANSACTION_TYPE", "CREDIT_CARD_NO"],
+        },
+    },
+    "CDW_SAPP_loan_application": {
+        "columns": {
+            "Application_ID": "VARCHAR(16) NOT NULL",
+            "Gender": "VARCHAR(16)",
+            "Married": "VARCHAR(8)",
+            "Dependents": "VARCHAR(8)",
+            "Education": "VARCHAR(16)",
+            "Self_Employed": "VARCHAR(8)",
+            "Credit_History": "INT",
+            "Property_Area": "VARCHAR(16)",
+            "Income": "VARCHAR(16)",
+            "Application_Status": "CHAR(1)",
+        },
+        "primary_key": ["Application_ID"],
+        "indexes": {},
+    },
+}
+
+# Queries the EXPLAIN check runs, with a function building sample parameters
+# from a transaction row (CREDIT_CARD_NO, CUST_SSN, MONTH, YEAR, TRANSACTION_DATE, TRANSACTION_ID, CUST_ZIP)
+MENU_QUERY_PARAMS = {
+    "transactions_by_zip_month": lambda r: (r["CUST_ZIP"], *month_bounds(r["YEAR"], r["MONTH"])),
+    "customer_by_ssn": lambda r: (r["CUST_SSN"],),
+    "monthly_bill": lambda r: (r["CREDIT_CARD_NO"], r["MONTH"], r["YEAR"]),
+    "monthly_bill_summary": lambda r: (r["CREDIT_CARD_NO"], r["YEAR"], r["MONTH"]),
+    "monthly_bill_breakdown": lambda r: (r["CREDIT_CARD_NO"], r["YEAR"], r["MONTH"]),
+    "transactions_between_dates": lambda r: (r["CUST_SSN"], r["TRANSACTION_DATE"], r["TRANSACTION_DATE"]),
+    "transactions_by_zip_month_older": lambda r: (r["CUST_ZIP"], *month_bounds(r["YEAR"], r["MONTH"]),
+                                                  r["TRANSACTION_DATE"], r["TRANSACTION_DATE"],
+                                                  r["TRANSACTION_ID"], 20),
+    "transactions_between_dates_older": lambda r: (r["CUST_SSN"], r["TRANSACTION_DATE"], r["TRANSACTION_DATE"],
+                                                   r["TRANSACTION_DATE"], r["TRANSACTION_DATE"],
+                                                   r["TRANSACTION_ID"], 20),
+}
+
+
+def _normalize_type(column_type):
+    # "int(11)" (MySQL 5.7) and "int" (8.0) are the same type
+    column_type = column_type.lower().replace(" not null", "")
+    return re.sub(r"\b(tinyint|smallint|int|bigint)\(\d+\)", r"\1", column_type)
+
+
+def _existing_columns(cursor, table):
+    cursor.execute(
+        "SELECT COLUMN_NAME, COLUMN_TYPE, IS_NULLABLE FROM information_schema.COLUMNS "
+        "WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s", (DB_NAME, table))
+    return {name: (_normalize_type(column_type), nullable == "YES")
+            for name, column_type, nullable in cursor.fetchall()}
+
+
+def _existing_indexes(cursor, table):
+    cursor.execute(
+        "SELECT INDEX_NAME, COLUMN_NAME FROM information_schema.STATISTICS "
+        "WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s ORDER BY INDEX_NAME, SEQ_IN_INDEX", (DB_NAME, table))
+    indexes = {}
+    for index_name, column in cursor.fetchall():
+        indexes.setdefault(index_name, []).append(column)
+    return indexes
+
+
+def table_ddl(cursor, table, spec):
+    """
+    Return the ALTER TABLE clauses that bring table in line with spec (empty if it already is).
+
+    Args:
+        cursor: Open cursor on the capstone database.
+        table (str): Table name.
+        spec (dict): Entry of TABLES.
+
+    Returns:
+        list: ALTER TABLE clauses, e.g. "MODIFY SSN INT NOT NULL".
+    """
+    columns = _existing_columns(cursor, table)
+    if not columns:
+        return []
+    indexes = _existing_indexes(cursor, table)
+
+    clauses = []
+    for column, definition in spec["columns"].items():
+        if column not in columns:
+            # Tables created by an older ETL: add the column so loads can write it
+            clauses.append(f"ADD COLUMN {column} {definition}")
+            continue
+        wanted = (_normalize_type(definition), "NOT NULL" not in definition.upper())
+        if columns[column] != wanted:
+            clauses.append(f"MODIFY {column} {definition}")
+    if spec["primary_key"] and indexes.get("PRIMARY") != spec["primary_key"]:
+        if "PRIMARY" in indexes:
+            clauses.append("DROP PRIMARY KEY")
+        clauses.append(f"ADD PRIMARY KEY ({', '.join(spec['primary_key'])})")
+    for index_name in spec.get("retired_indexes", []):
+        if index_name in indexes:
+            clauses.append(f"DROP INDEX {index_name}")
+    for index_name, index_columns in spec["indexes"].items():
+        if not all(c in columns or c in spec["columns"] for c in index_columns):
+            continue
+        if indexes.get(index_name) != index_columns:
+            if index_name in indexes:
+                clauses.append(f"DROP INDEX {index_name}")
+            clauses.append(f"ADD INDEX {index_name} ({', '.join(index_columns)})")
+    return clauses
+
+
+def table_backfills(spec, clauses):
+    """
+    Return the UPDATE statements that fill the columns clauses add to an existing table.
+
+    Args:
+        spec (dict): Entry of TABLES.
+        clauses (list): ALTER TABLE clauses, as from table_ddl().
+    """
+    added = {clause.split()[2] for clause in clauses if clause.startswith("ADD COLUMN ")}
+    return [statement for columns, statement in spec.get("backfill", {}).items() if added.intersection(columns)]
+
+
+def bootstrap(tables=TABLES):
+    """
+    Apply column types, primary keys and indexes to every table that exists.
+
+    All changes to a table go in one ALTER TABLE, so it is rebuilt at most once.
+    Columns added to a table with rows are then filled by its backfill statements.
+
+    Returns:
+        dict: table -> list of applied clauses.
+    """
+    applied = {}
+    connection = connect()
+    try:
+        cursor = connection.cursor()
+        for table, spec in tables.items():
+            clauses = table_ddl(cursor, table, spec)
+            if clauses:
+                cursor.execute(f"ALTER TABLE {table} " + ", ".join(clauses))
+                logging.info(f"Bootstrapped {table}: {'; '.join(clauses)}")
+                for statement in table_backfills(spec, clauses):
+                    cursor.execute(statement)
+                    logging.info(f"Backfilled {cursor.rowcount} rows of {table}")
+            applied[table] = clauses
+        connection.commit()
+        cursor.close()
+    finally:
+        connection.close()
+    return applied
+
+
+def check_indexes(queries=MENU_QUERY_PARAMS):
+    """
+    EXPLAIN every menu query and report the ones that read a table without an index.
+
+    Returns:
+        dict: query name -> list of tables read with a full scan (empty when the query is indexed).
+    """
+    connection = connect()
+    try:
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute(
+            "SELECT cc.CREDIT_CARD_NO, cc.CUST_SSN, cc.MONTH, cc.YEAR, cc.TRANSACTION_DATE, cc.TRANSACTION_ID, c.CUST_ZIP "
+            "FROM CDW_SAPP_CREDIT_CARD cc JOIN CDW_SAPP_CUSTOMER c ON c.SSN = cc.CUST_SSN LIMIT 1")
+        sample = cursor.fetchone()
+        if sample is None:
+            raise RuntimeError("CDW_SAPP_CREDIT_CARD has no rows to build sample parameters from")
+
+        report = {}
+        for name, params in queries.items():
+            cursor.execute("EXPLAIN " + QUERIES[name], params(sample))
+            plan = cursor.fetchall()
+            # Rows without a table are plan notes such as "Select tables optimized away"
+            report[name] = [row["table"] for row in plan
+                            if row["table"] is not None and (row["type"] == "ALL" or row["key"] is None)]
+        cursor.close()
+    finally:
+        connection.close()
+
+    for name, scans in report.items():
+        status = "OK (index)" if not scans else f"FULL SCAN of {', '.join(scans)}"
+        print(f"{name:<32} {status}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create keys and indexes on the CDW_SAPP tables")
+    parser.add_argument("--check", action="store_true", help="only EXPLAIN the menu queries")
+    args = parser.parse_args()
+    if not args.check:
+        bootstrap()
+    report = check_indexes()
+    if any(report.values()):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# Page-by-page browsing of the console's transaction listings.
+#
+# customer_transaction_zipcode_month_year and display_transactions_between_dates
+# used to fetchall() every matching row and print them all at once. A
+# TransactionPager fetches one page at a time through the keyset queries in
+# data_access.PAGED_LISTINGS. Each page is a short LIMIT query seeking from the
+# (TRANSACTION_DATE, TRANSACTION_ID) of a row on the current page, so memory
+# stays at one page, and page 1000 costs the same as page 1. No cursor is held
+# open while the operator reads, so no pooled connection is tied up either.
+
+import data_access
+
+PAGE_SIZE = 20
+
+# listing -> positions of TRANSACTION_DATE and TRANSACTION_ID in its rows
+KEY_COLUMNS = {
+    "transactions_by_zip_month": (7, 1),
+    "transactions_between_dates": (3, 0),
+}
+
+
+class TransactionPager:
+    """
+    Forward / backward keyset pagination over one of data_access.PAGED_LISTINGS.
+
+    Args:
+        listing (str): "transactions_by_zip_month" or "transactions_between_dates".
+        params (tuple): The listing's own query parameters.
+        page_size (int): Rows per page.
+    """
+
+    def __init__(self, listing, params, page_size=PAGE_SIZE):
+        self.listing = listing
+        self.params = tuple(params)
+        self.page_size = page_size
+        self.page = []
+        self.page_number = 0
+        self.has_next = False
+        self.has_previous = False
+
+    def _key(self, row):
+        day, transaction_id = KEY_COLUMNS[self.listing]
+        return (row[day], row[day], row[transaction_id])
+
+    def _fetch(self, direction, key=()):
+        # One extra row tells whether there is another page in that direction
+        rows = data_access.fetchall(f"{self.listing}_{direction}",
+                                    self.params + tuple(key) + (self.page_size + 1,))
+        more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if direction == "newer":
+            rows.reverse()
+        return rows, more
+
+    def first_page(self):
+        """
+        Return the newest page.
+        """
+        self.page, self.has_next = self._fetch("first")
+        self.has_previous = False
+        self.page_number = 1 if self.page else 0
+        return self.page
+
+    def next_page(self):
+        """
+        Return the page of rows older than the current one; the current page again at the end.
+        """
+        if not self.page:
+            return self.first_page()
+        if not self.has_next:
+            return self.page
+        self.page, self.has_next = self._fetch("older", self._key(self.page[-1]))
+        self.has_previous = True
+        self.page_number += 1
+        return self.page
+
+    def previous_page(self):
+        """
+        Return the page of rows newer than the current one; the current page again at the start.
+        """
+        if not self.page or not self.has_previous:
+            return self.page
+        self.page, self.has_previous = self._fetch("newer", self._key(self.page[0]))
+        self.has_next = True
+        self.page_number -= 1
+        return self.page
+
+
+def browse(pager, print_row, prompt=input):
+    """
+    Print a listing page by page, letting the operator move with n(ext), p(revious) and q(uit).
+
+    Args:
+        pager (TransactionPager): The listing to show.
+        print_row (callable): Prints one row.
+        prompt (callable): Reads the operator's command.
+
+    Returns:
+        bool: False if the listing was empty.
+    """
+    if not pager.first_page():
+        return False
+    while True:
+        print(f"\nTransactions (page {pager.page_number}):")
+        for row in pager.page:
+            print_row(row)
+        if not (pager.has_next or pager.has_previous):
+            return True
+        options = [label for label, available in (("[n]ext", pager.has_next),
+                                                  ("[p]revious", pager.has_previous)) if available]
+        command = prompt(", ".join(options + ["[q]uit"]) + ": ").strip().lower()
+        if command == "n" and pager.has_next:
+            pager.next_page()
+        elif command == "p" and pager.has_previous:
+            pager.previous_page()
+        elif command == "q":
+            return True
@@ -0,0 +1,100 @@
+# Persisted high-water-marks of the incremental loads (watermarks.json).
+#
+# Kept apart from incremental_load.py so the SQL-only modules (monthly summary,
+# batch billing) can read and advance watermarks without importing Spark.
+#
+# The file is shared by several processes (the ETL, bulk updates, the console),
+# each owning a few keys. Writers go through update_watermarks(), which holds an
+# exclusive lock from the read to the save, so no writer overwrites a key another
+# one changed meanwhile. Hot readers (the cache generation checks) use
+# read_watermarks(), which only re-parses the file after it was replaced.
+
+import json
+import os
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+WATERMARK_FILE = "watermarks.json"
+
+# path -> ((mtime, size, inode), watermarks) of the last read_watermarks()
+_cached = {}
+
+
+def load_watermarks(path=WATERMARK_FILE):
+    """
+    Read the persisted high-water-marks.
+
+    Returns:
+        dict: table -> {column: value}; empty when nothing has been loaded yet.
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_watermarks(watermarks, path=WATERMARK_FILE):
+    """
+    Persist the high-water-marks atomically, so a crash never leaves a half-written file.
+    """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(watermarks, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def read_watermarks(path=WATERMARK_FILE):
+    """
+    Return the watermarks like load_watermarks(), re-reading the file only when it has changed.
+
+    The result is shared between calls: do not modify it.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return {}
+    # save_watermarks() replaces the file, so a new file has a new inode as well
+    version = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+    cached = _cached.get(path)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    watermarks = load_watermarks(path)
+    _cached[path] = (version, watermarks)
+    return watermarks
+
+
+def _lock(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+    else:
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+
+def _unlock(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def update_watermarks(path=WATERMARK_FILE):
+    """
+    Read, change and save the watermarks while holding an exclusive lock on them.
+
+    Yields:
+        dict: The current watermarks; saved when the with block ends without an exception.
+    """
+    with open(path + ".lock", "a") as lock:
+        _lock(lock)
+        try:
+            watermarks = load_watermarks(path)
+            yield watermarks
+            save_watermarks(watermarks, path)
+        finally:
+            _unlock(lock)